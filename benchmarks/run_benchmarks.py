@@ -0,0 +1,249 @@
+"""
+run_benchmarks.py
+-----------------
+Times and memory-profiles every stage of the analysis pipeline on synthetic
+datasets (see synthetic.py) and writes the results to a JSON file so runs
+on different commits can be compared.
+
+Stages:
+
+-ingest_cold: parse the CSV and build the columnar cache
+-ingest_warm: memory-map all columns from the cache
+-legacy_parse: pd.read_csv of the whole log, as the original scripts did
+-coerce_dropna: their per-column pd.to_numeric + dropna on the parsed frame
+-load_dropna: the same through ingestion.load_columns(dropna=True)
+-efficiency: efficiency.compute_efficiencies over all rows
+-stream_metrics: chunked aggregates from streaming.py
+-polynomial_fit: seven degree-10 fits against Power_Level (PolynomialSmoother)
+-tafel_fit: automatic Tafel region search (window edges on at most --tafel-points
+ groups of points)
+-render: the eleven metric plots through rendering.render_all
+
+Time is the best of --repeat untraced runs (time.perf_counter); memory is
+the peak traced allocation of one extra run (tracemalloc, which also sees
+NumPy buffers).  tracemalloc cannot see the render worker processes, so the
+render stage reports `worker_peak_rss_bytes` instead: the largest resident
+set of any worker process so far (getrusage of reaped children, Unix only).
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 1e3 1e4 1e5 1e6
+    python benchmarks/run_benchmarks.py --compare results/benchmarks/old.json results/benchmarks/new.json
+"""
+
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / 'src' / 'src'))
+
+import efficiency  # noqa: E402
+import streaming  # noqa: E402
+from fitting import PolynomialSmoother  # noqa: E402
+from ingestion import COLUMNS, build_cache, load_columns  # noqa: E402
+from rendering import PlotSpec, render_all  # noqa: E402
+from synthetic import generate, write_csv  # noqa: E402
+from tafel_region import find_tafel_region  # noqa: E402
+
+DEFAULT_OUTPUT_DIR = REPO_ROOT / 'results' / 'benchmarks'
+
+PLOT_COLUMNS = ['Power_Level', 'Voltage_Cell', 'Current_Density', 'Real_Hydrogen_Volume_Flow_m3',
+                'Voltage_Efficiency', 'Faraday_Efficiency', 'Cell_Efficiency', 'Overall_Efficiency']
+
+
+def measure(func, repeat, traced=True):
+    """Return (best seconds over `repeat` untraced runs, peak traced bytes of one extra run or None)."""
+    peak = None
+    if traced:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best, peak
+
+
+def worker_peak_rss():
+    """Largest resident set (bytes) of any reaped child process so far, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # macOS reports bytes, Linux KiB
+
+
+def legacy_parse(csv_path):
+    """The original scripts' text parse of the whole log."""
+    df = pd.read_csv(csv_path, header=None, skiprows=1, low_memory=False)
+    df.columns = COLUMNS
+    return df.drop(0)
+
+
+def legacy_coerce(df):
+    """The original scripts' coercion of a parsed frame; `df` itself is left untouched."""
+    df = df.copy(deep=False)
+    for name in PLOT_COLUMNS:
+        df[name] = pd.to_numeric(df[name], errors='coerce')
+    return df.dropna(subset=PLOT_COLUMNS)
+
+
+# The eleven (x, y) pairs drawn by plot_all_metrics.py
+PLOT_PAIRS = [('Power_Level', y) for y in PLOT_COLUMNS[1:]] + [
+    ('Current_Density', 'Real_Hydrogen_Volume_Flow_m3'), ('Current_Density', 'Faraday_Efficiency'),
+    ('Voltage_Cell', 'Real_Hydrogen_Volume_Flow_m3'), ('Voltage_Cell', 'Voltage_Efficiency'),
+]
+
+
+def plot_specs(data, smoother):
+    return [PlotSpec(f'{x}_vs_{y}.png', f'{x} vs {y}', x, y, data[x], data[y], *smoother.curve(x, y), 'blue', y)
+            for x, y in PLOT_PAIRS]
+
+
+def run_size(rows, workdir, repeat, stages, tafel_points, render_max, processes):
+    """Benchmark every selected stage on one synthetic dataset; returns a list of records."""
+    csv_path = write_csv(generate(rows), Path(workdir) / f'synthetic_{rows}.csv')
+    cache_dir = Path(workdir) / 'cache'
+    records = []
+
+    def record(stage, func, times=repeat, traced=True):
+        if stage not in stages:
+            return
+        seconds, peak = measure(func, times, traced)
+        entry = {'rows': rows, 'stage': stage, 'seconds': seconds, 'peak_bytes': peak,
+                 'rows_per_second': rows / seconds if seconds > 0 else None}
+        if not traced:
+            peak = entry['worker_peak_rss_bytes'] = worker_peak_rss()
+        records.append(entry)
+        memory = f'{peak / 2**20:10.1f} MiB' if peak is not None else f'{"n/a":>10}'
+        print(f'{rows:>10} {stage:<16} {seconds:10.4f} s {memory}', flush=True)
+
+    record('ingest_cold', lambda: build_cache(csv_path, cache_dir))
+    build_cache(csv_path, cache_dir)
+    record('ingest_warm', lambda: load_columns(csv_path, cache_dir=cache_dir))
+    record('legacy_parse', lambda: legacy_parse(csv_path))
+    if 'coerce_dropna' in stages:
+        frame = legacy_parse(csv_path)
+        record('coerce_dropna', lambda: legacy_coerce(frame))
+        del frame
+    record('load_dropna', lambda: load_columns(csv_path, PLOT_COLUMNS, cache_dir=cache_dir, dropna=True))
+
+    data = {name: np.asarray(values) for name, values in load_columns(csv_path, cache_dir=cache_dir).items()}
+    record('efficiency', lambda: efficiency.compute_efficiencies(data))
+
+    def stream():
+        accumulator = streaming.MetricAccumulator()
+        for start in range(0, rows, 1_000_000):
+            accumulator.update({name: data[name][start:start + 1_000_000] for name in streaming.STREAM_COLUMNS})
+        return accumulator.result()
+    record('stream_metrics', stream)
+
+    record('polynomial_fit', lambda: PolynomialSmoother(data).fit('Power_Level', PLOT_COLUMNS[1:]))
+
+    log_j = np.log10(data['Current_Density'])
+    eta = efficiency.overpotential(data['Voltage_Cell'])
+    record('tafel_fit', lambda: find_tafel_region(log_j, eta, max_points=tafel_points))
+
+    if rows <= render_max:
+        smoother = PolynomialSmoother(data)
+        specs = plot_specs(data, smoother)
+        out_dir = Path(workdir) / 'plots'
+        # Worker processes are invisible to tracemalloc: trace only in-process rendering
+        record('render', lambda: render_all(specs, out_dir, processes), times=1, traced=processes == 1)
+    return records
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(old_path, new_path):
+    """Print per-(rows, stage) time and memory ratios between two result files."""
+    old = {(r['rows'], r['stage']): r for r in json.loads(Path(old_path).read_text())['results']}
+    new = json.loads(Path(new_path).read_text())['results']
+    print(f'{"rows":>10} {"stage":<16} {"old s":>10} {"new s":>10} {"time x":>8} {"mem x":>8}')
+    for r in new:
+        before = old.get((r['rows'], r['stage']))
+        if before is None:
+            continue
+        speed = before['seconds'] / r['seconds'] if r['seconds'] else float('nan')
+        memory = (r['peak_bytes'] / before['peak_bytes'] if r.get('peak_bytes') and before.get('peak_bytes')
+                  else float('nan'))
+        print(f'{r["rows"]:>10} {r["stage"]:<16} {before["seconds"]:10.4f} {r["seconds"]:10.4f} '
+              f'{speed:8.2f} {memory:8.2f}')
+
+
+ALL_STAGES = ['ingest_cold', 'ingest_warm', 'legacy_parse', 'coerce_dropna', 'load_dropna', 'efficiency',
+              'stream_metrics', 'polynomial_fit', 'tafel_fit', 'render']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the electrolyzer analysis pipeline.')
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5, 1e6],
+                        help='Dataset sizes in rows (up to 1e7)')
+    parser.add_argument('--stages', nargs='+', default=ALL_STAGES, choices=ALL_STAGES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tafel-points', type=int, default=2000, help='Point groups in the O(n²) Tafel window search')
+    parser.add_argument('--render-max', type=float, default=1e6, help='Skip rendering above this many rows')
+    parser.add_argument('--processes', type=int, default=None, help='Rendering worker processes')
+    parser.add_argument('--output', default=None, help='Result JSON (default: results/benchmarks/<time>-<commit>.json)')
+    parser.add_argument('--workdir', default=None, help='Where synthetic data is written (default: a temp dir)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files and exit')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc)
+    output = Path(args.output or DEFAULT_OUTPUT_DIR / f'{stamp:%Y%m%dT%H%M%S}-{commit}.json')
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='electrolyzer-bench-'))
+
+    results = []
+    try:
+        for rows in args.sizes:
+            results += run_size(int(rows), workdir, args.repeat, set(args.stages), args.tafel_points,
+                                args.render_max, args.processes)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'commit': commit,
+        'timestamp': stamp.isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }, indent=2))
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+synthetic.py
+------------
+Synthetic electrolyzer logs with the 20-column Book1.xlsx schema.
+
+Rows follow the physics used elsewhere in the analysis: the cell voltage
+comes from the polarization model (activation + ohmic + concentration)
+with a temperature-dependent E_rev, the hydrogen flow from a Faraday
+efficiency that drops at low current density, and every calculated column
+is derived with the same formulas as the workbook.  Gaussian measurement
+noise is added to the raw signals.
+
+Usage:
+    python benchmarks/synthetic.py 1000000 data/synthetic_1e6.csv
+"""
+
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'src'))
+
+import efficiency  # noqa: E402
+from ingestion import COLUMNS  # noqa: E402
+from polarization import cell_voltage  # noqa: E402
+
+# Units row of Book1.xlsx, written as the second header line of the CSV
+UNITS = [
+    'Power Level (%)', 'Voltage (V)', 'Current (A)', 'Surface Area Membrane (m^2)', 'Hydrogen Volume Flow (m3n/h)',
+    'Valve Output', 'Temperature (C) ', 'Pressure (bar)', 'Voltage cell (V)', 'Current Density (mA/cm2)',
+    'Current cell (A)', 'Real Hydrogen Volume Flow (m3n/h)', 'Real Hydrogen Volume Flow (kg/h)', 'g/s',
+    'Real Hydrogen Volume Flow (mol/s)', 'Voltage Efficiency', 'Faraday (Current) Efficiency', 'Cell Efiiciency',
+    'Power', 'Overall Efficiency'
+]
+
+SURFACE_AREA = 702.0  # cm², as in Book1.xlsx
+VALVE_OUTPUT = 61.666668
+MAX_CURRENT_DENSITY = 180.0  # mA/cm² at 100 % power
+MOLAR_VOLUME = 0.022414  # m³n/mol
+
+
+def generate(rows, seed=0, noise=1.0):
+    """Return a DataFrame of `rows` synthetic samples with the COLUMNS schema."""
+    rng = np.random.default_rng(seed)
+    power_level = rng.uniform(20, 100, rows).round(1)
+    temperature = rng.uniform(15, 60, rows)
+    pressure = rng.uniform(4.5, 5.5, rows)
+
+    current_density = MAX_CURRENT_DENSITY * power_level / 100 * (1 + noise * rng.normal(0, 0.005, rows))
+    e_rev = efficiency.reversible_voltage(temperature, pressure)
+    # Ohmic resistance falls as the membrane warms up
+    r_ohm = 2.2 * (1 - 0.004 * (temperature - 17))
+    voltage_cell = cell_voltage(current_density, e_rev, 2e-3, 0.035, r_ohm, 0.02, 0.25)
+    voltage_cell = voltage_cell + noise * rng.normal(0, 0.003, rows)
+    voltage = voltage_cell * efficiency.N_CELLS
+    current = current_density * SURFACE_AREA / 1000
+
+    eta_f = np.clip(0.995 - 0.2 * np.exp(-current_density / 25) + noise * rng.normal(0, 0.003, rows), 0, 1)
+    mol_flow = eta_f * current * efficiency.N_CELLS_FARADAY / (2 * efficiency.FARADAY)
+    real_flow_m3 = mol_flow * 3600 * MOLAR_VOLUME
+    real_flow_kg = real_flow_m3 * 0.08988
+    power = voltage * current
+
+    data = {
+        'Power_Level': power_level,
+        'Voltage': voltage,
+        'Current': current,
+        'Surface_Area': np.full(rows, SURFACE_AREA),
+        'Hydrogen_Volume_Flow': real_flow_m3 * VALVE_OUTPUT / 100,
+        'Valve_Output': np.full(rows, VALVE_OUTPUT),
+        'Temperature': temperature,
+        'Pressure': pressure,
+        'Voltage_Cell': voltage_cell,
+        'Current_Density': current_density,
+        'Current_Cell': current,
+        'Real_Hydrogen_Volume_Flow_m3': real_flow_m3,
+        'Real_Hydrogen_Volume_Flow_kg': real_flow_kg,
+        'Mass_Flow_kg_s': real_flow_kg / 3600 * 1000,
+        'Hydrogen_Mol_Flow': mol_flow,
+        'Voltage_Efficiency': efficiency.E0 / voltage_cell,
+        'Faraday_Efficiency': mol_flow * 2 * efficiency.FARADAY / (current * efficiency.N_CELLS_FARADAY),
+        'Cell_Efficiency': efficiency.E0 / voltage_cell * eta_f,
+        'Power': power,
+        'Overall_Efficiency': mol_flow * efficiency.LHV_H2 / power,
+    }
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def write_csv(df, path, chunk_rows=1_000_000):
+    """Write `df` as a CSV with the workbook's group and units header lines."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as fh:
+        fh.write('Raw Value' + ',' * 8 + 'Calculated Value' + ',' * 11 + '\n')
+        fh.write(','.join(UNITS) + '\n')
+        for start in range(0, len(df), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(fh, header=False, index=False, float_format='%.9g')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic electrolyzer log.')
+    parser.add_argument('rows', type=float, help='Number of rows (e.g. 1e6)')
+    parser.add_argument('output', help='Output .csv (or .xlsx for up to ~1e6 rows)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generate(int(args.rows), args.seed)
+    if args.output.endswith('.xlsx'):
+        pd.concat([pd.DataFrame([UNITS], columns=COLUMNS), df]).to_excel(args.output, index=False)
+    else:
+        write_csv(df, args.output)
+
+
+if __name__ == '__main__':
+    main()
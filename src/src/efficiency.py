@@ -0,0 +1,119 @@
+"""
+efficiency.py
+-------------
+Per-row electrochemical quantities shared by the analysis scripts.
+
+The formulas mirror the calculated columns of Book1.xlsx:
+
+-Overpotential η = (V_cell - E0) * 1000 (mV)
+-Voltage efficiency ηV = E_rev / V_cell
+-Faraday efficiency ηF = n_H2 * 2F / (I_cell * N)
+-Cell efficiency ηcell = ηV * ηF
+-Overall efficiency ηenergy = n_H2 * LHV / (U * I)
+-Specific energy = LHV per kg / ηenergy (kWh/kg H2)
+
+All functions take scalars or NumPy arrays and return the same shape.
+compute_efficiencies() derives every efficiency straight from the raw
+signals in one vectorized pass, so a new dataset does not have to be
+prepared in Excel first.
+"""
+
+
+import numpy as np
+
+from instrumentation import traced
+
+E0 = 1.23  # Standard potential used for overpotential and voltage efficiency (V)
+FARADAY = 96485.0  # Faraday constant (C/mol)
+N_CELLS = 10  # Cells in the stack (Voltage_Cell = Voltage / N_CELLS)
+N_CELLS_FARADAY = 9  # Cell count used in the Faraday efficiency column of Book1.xlsx
+GAS_CONSTANT = 8.314462618  # J/(mol K)
+LHV_H2 = 241881.0  # Lower heating value of hydrogen (J/mol), as in Book1.xlsx
+H2_MOLAR_MASS = 2.01588e-3  # kg/mol
+E_REV_STANDARD = 1.229  # Reversible voltage at 25 °C and 1 bar (V)
+DE_REV_DT = -0.9e-3  # Temperature coefficient of the reversible voltage (V/K)
+T_STANDARD = 298.15  # K
+
+
+def overpotential(voltage_cell, e0=E0):
+    """Overpotential in mV."""
+    return (np.asarray(voltage_cell) - e0) * 1000
+
+
+def voltage_efficiency(voltage_cell, e_rev=E0):
+    """ηV = E_rev / V_cell."""
+    return e_rev / np.asarray(voltage_cell)
+
+
+def faraday_efficiency(hydrogen_mol_flow, current_cell, n_cells=N_CELLS_FARADAY):
+    """ηF = n_H2 * 2F / (I * N) with n_H2 in mol/s and I in A."""
+    return np.asarray(hydrogen_mol_flow) * 2 * FARADAY / (np.asarray(current_cell) * n_cells)
+
+
+def cell_efficiency(eta_v, eta_f):
+    """ηcell = ηV * ηF."""
+    return np.asarray(eta_v) * np.asarray(eta_f)
+
+
+def reversible_voltage(temperature, pressure):
+    """
+    Temperature- and pressure-corrected reversible voltage (V).
+
+    Temperature in °C, pressure as absolute bar on both electrodes:
+    E_rev = 1.229 - 0.9e-3 (T - 298.15) + RT/(2F) ln(p_H2 p_O2^0.5),
+    with unit water activity.
+    """
+    t_kelvin = np.asarray(temperature, dtype=float) + 273.15
+    pressure = np.asarray(pressure, dtype=float)
+    nernst = GAS_CONSTANT * t_kelvin / (2 * FARADAY) * (1.5 * np.log(pressure))
+    return E_REV_STANDARD + DE_REV_DT * (t_kelvin - T_STANDARD) + nernst
+
+
+def overall_efficiency(hydrogen_mol_flow, voltage, current):
+    """ηenergy = n_H2 * LHV / (U * I) with n_H2 in mol/s, U in V and I in A."""
+    return np.asarray(hydrogen_mol_flow) * LHV_H2 / (np.asarray(voltage) * np.asarray(current))
+
+
+def specific_energy(eta_overall):
+    """Electrical energy per kg of hydrogen (kWh/kg) at an overall (LHV) efficiency."""
+    return LHV_H2 / H2_MOLAR_MASS / 3.6e6 / np.asarray(eta_overall)
+
+
+@traced('efficiency')
+def compute_efficiencies(data, e_rev=None, n_cells=N_CELLS, n_cells_faraday=N_CELLS_FARADAY, dtype='float64'):
+    """
+    Derive all four efficiencies from raw signals.
+
+    `data` is anything indexable by column name (the dict from
+    ingestion.load_columns or a DataFrame) providing Voltage, Current,
+    Surface_Area, Hydrogen_Mol_Flow, Temperature and Pressure.  With
+    `e_rev=None` the reversible voltage is corrected for temperature and
+    pressure per row; pass a number (e.g. E0) to reproduce the workbook.
+
+    Returns a dict of arrays: Voltage_Cell, Current_Density, E_rev, Power,
+    Voltage_Efficiency, Faraday_Efficiency, Cell_Efficiency and
+    Overall_Efficiency.
+    """
+    voltage = np.asarray(data['Voltage'], dtype=dtype)
+    current = np.asarray(data['Current'], dtype=dtype)
+    mol_flow = np.asarray(data['Hydrogen_Mol_Flow'], dtype=dtype)
+
+    if e_rev is None:
+        e_rev = reversible_voltage(data['Temperature'], data['Pressure']).astype(dtype, copy=False)
+    else:
+        e_rev = np.full(voltage.shape, e_rev, dtype=dtype)
+
+    voltage_cell = voltage / n_cells
+    power = voltage * current
+    eta_v = e_rev / voltage_cell
+    eta_f = mol_flow * (2 * FARADAY / n_cells_faraday) / current
+    return {
+        'Voltage_Cell': voltage_cell,
+        'Current_Density': current * 1000 / np.asarray(data['Surface_Area'], dtype=dtype),
+        'E_rev': e_rev,
+        'Power': power,
+        'Voltage_Efficiency': eta_v,
+        'Faraday_Efficiency': eta_f,
+        'Cell_Efficiency': eta_v * eta_f,
+        'Overall_Efficiency': mol_flow * LHV_H2 / power,
+    }
@@ -0,0 +1,206 @@
+"""
+fitting.py
+----------
+Batched polynomial smoothing for the metric plots.
+
+Every smoothed curve in the scripts is a degree-10 least-squares polynomial
+against one of a few abscissae (Power_Level, Current_Density, Voltage_Cell).
+Instead of calling Polynomial.fit once per curve, the scaled Vandermonde
+matrix of each x column is QR-factorized once and every y column is solved
+against it in a single multi-right-hand-side solve.  Fitted polynomials and
+their evaluation grids are cached by (x column, y column, degree).
+
+The fitted objects are ordinary numpy Polynomial instances with the same
+domain/window mapping that Polynomial.fit uses, so they drop into existing
+code unchanged.
+
+Confidence bands come from a residual bootstrap: every resampled data set
+ŷ + r[idx] shares the design matrix, so all resamples are solved against the
+same cached factorization as blocks of right-hand sides, without refitting.
+Above BOOTSTRAP_ROWS points the resamples are drawn for a fixed random subset
+of rows and rescaled (m-out-of-n bootstrap), so the cost no longer grows with
+the dataset.
+"""
+
+
+import numpy as np
+from numpy.polynomial import polynomial as P
+from numpy.polynomial import polyutils as pu
+from numpy.polynomial.polynomial import Polynomial
+from scipy.linalg import solve_triangular
+
+from instrumentation import stage
+
+WINDOW = np.array([-1.0, 1.0])
+BOOTSTRAP_BLOCK = 4_000_000  # Resampled residuals generated per vectorized block
+BOOTSTRAP_ROWS = 10_000  # Rows resampled per bootstrap replicate on larger datasets
+
+
+def fit_domain(x):
+    """Data domain [min, max] of `x` as Polynomial.fit chooses it."""
+    x = np.asarray(x, dtype=float)
+    domain = np.array([x.min(), x.max()])
+    if domain[0] == domain[1]:
+        # Same fallback as Polynomial.fit for a constant abscissa
+        domain = domain + np.array([-1.0, 1.0])
+    return domain
+
+
+class ScaledLeastSquares:
+    """QR factorization of a column-scaled design (Vandermonde) matrix, solved for many right-hand sides."""
+
+    def __init__(self, vander):
+        # Column scaling, as in numpy's polyfit, keeps the high-degree columns well conditioned
+        self.scale = np.sqrt(np.square(vander).sum(axis=0))
+        self.scale[self.scale == 0] = 1
+        vander = vander / self.scale
+        if vander.shape[0] >= vander.shape[1]:
+            self.q, self.r = np.linalg.qr(vander)
+            self.pinv = None
+            if np.abs(np.diag(self.r)).min() <= np.finfo(float).eps * vander.shape[0] * np.abs(self.r).max():
+                self.pinv = np.linalg.pinv(vander)
+        else:
+            self.q = self.r = None
+            self.pinv = np.linalg.pinv(vander)
+
+    def solve(self, ys, rows=None):
+        """
+        Coefficients (columns of the design, k) for a (n, k) block of y columns.
+
+        With `rows`, `ys` holds values for those rows only and the other rows
+        count as zero (used for the linear bootstrap updates).
+        """
+        if self.pinv is not None:
+            coef = (self.pinv if rows is None else self.pinv[:, rows]) @ ys
+        else:
+            coef = solve_triangular(self.r, (self.q if rows is None else self.q[rows]).T @ ys)
+        return coef / self.scale[:, None]
+
+
+class _Factorization(ScaledLeastSquares):
+    """QR factorization of the scaled Vandermonde matrix for one x vector."""
+
+    def __init__(self, x, degree):
+        self.domain = fit_domain(x)
+        self.degree = degree
+        self.off, self.scl = pu.mapparms(self.domain, WINDOW)
+        super().__init__(P.polyvander(self.map(x), degree))
+
+    def map(self, x):
+        """Map x from the data domain to the [-1, 1] window."""
+        return self.off + self.scl * np.asarray(x, dtype=float)
+
+
+def fit_many(x, ys, degree):
+    """Fit one polynomial per column of `ys` (shape (n,) or (n, k)) against `x`."""
+    ys = np.asarray(ys, dtype=float)
+    single = ys.ndim == 1
+    factor = _Factorization(x, degree)
+    coef = factor.solve(ys[:, None] if single else ys)
+    polys = [Polynomial(c, domain=factor.domain, window=WINDOW) for c in coef.T]
+    return polys[0] if single else polys
+
+
+def bootstrap_band(x, y, grid, degree=10, n_resamples=10_000, confidence=0.95, seed=None, factor=None):
+    """
+    Residual-bootstrap confidence band of a least-squares polynomial on `grid`.
+
+    Residuals are inflated by sqrt(n / (n - degree - 1)) to undo the shrinkage
+    of fitted residuals.  Returns (curve, low, high) evaluated on `grid`.
+    """
+    y = np.asarray(y, dtype=float)
+    factor = factor if factor is not None else _Factorization(x, degree)
+    coef = factor.solve(y[:, None])[:, 0]
+    residuals = y - P.polyval(factor.map(x), coef)
+    n, dof = y.size, y.size - degree - 1
+    if dof > 0:
+        residuals = residuals * np.sqrt(n / dof)
+
+    # The fit is linear in y, so each resample only needs the fit of its resampled residuals
+    grid_vander = P.polyvander(factor.map(grid), degree)
+    rng = np.random.default_rng(seed)
+    rows, gain = None, 1.0
+    m = n
+    if n > BOOTSTRAP_ROWS:
+        # E[Q_J^T Q_J] = (m / n) Q^T Q, so sqrt(n / m) restores the full-data spread
+        m = BOOTSTRAP_ROWS
+        rows = np.sort(rng.choice(n, m, replace=False))
+        gain = np.sqrt(n / m)
+    block = max(1, BOOTSTRAP_BLOCK // m)
+    deltas = []
+    for first in range(0, n_resamples, block):
+        size = min(block, n_resamples - first)
+        resampled = residuals[rng.integers(0, n, size=(m, size))]
+        deltas.append(grid_vander @ factor.solve(resampled, rows))
+    deltas = gain * np.hstack(deltas)
+
+    tail = 50 * (1 - confidence)
+    low, high = np.percentile(deltas, [tail, 100 - tail], axis=1)
+    curve = grid_vander @ coef
+    return curve, curve + low, curve + high
+
+
+class PolynomialSmoother:
+    """
+    Cache of smoothed curves over one dataset.
+
+    `data` maps column names to equal-length arrays (e.g. the dict returned by
+    ingestion.load_columns with dropna=True).
+    """
+
+    def __init__(self, data, degree=10, n_points=200):
+        self.data = data
+        self.degree = degree
+        self.n_points = n_points
+        self._factors = {}
+        self._polys = {}
+        self._grids = {}
+        self._curves = {}
+        self._bands = {}
+
+    def _factor(self, x_col, degree):
+        key = (x_col, degree)
+        if key not in self._factors:
+            self._factors[key] = _Factorization(self.data[x_col], degree)
+        return self._factors[key]
+
+    def fit(self, x_col, y_cols, degree=None):
+        """Fit every column in `y_cols` against `x_col`; returns the polynomials in order."""
+        degree = self.degree if degree is None else degree
+        missing = [y for y in dict.fromkeys(y_cols) if (x_col, y, degree) not in self._polys]
+        if missing:
+            with stage('polynomial_fit', rows=len(self.data[x_col])):
+                factor = self._factor(x_col, degree)
+                ys = np.column_stack([np.asarray(self.data[y], dtype=float) for y in missing])
+                for y, c in zip(missing, factor.solve(ys).T):
+                    self._polys[(x_col, y, degree)] = Polynomial(c, domain=factor.domain, window=WINDOW)
+        return [self._polys[(x_col, y, degree)] for y in y_cols]
+
+    def grid(self, x_col):
+        """Evenly spaced evaluation grid over the range of `x_col`."""
+        if x_col not in self._grids:
+            x = self.data[x_col]
+            self._grids[x_col] = np.linspace(np.min(x), np.max(x), self.n_points)
+        return self._grids[x_col]
+
+    def curve(self, x_col, y_col, degree=None):
+        """Return (grid, smoothed values) for one curve, fitting it if necessary."""
+        degree = self.degree if degree is None else degree
+        key = (x_col, y_col, degree)
+        if key not in self._curves:
+            poly, = self.fit(x_col, [y_col], degree)
+            grid = self.grid(x_col)
+            self._curves[key] = (grid, poly(grid))
+        return self._curves[key]
+
+    def band(self, x_col, y_col, degree=None, n_resamples=10_000, confidence=0.95, seed=None):
+        """Return (grid, low, high) of the bootstrap confidence band of one curve."""
+        degree = self.degree if degree is None else degree
+        key = (x_col, y_col, degree, n_resamples, confidence, seed)
+        if key not in self._bands:
+            with stage('bootstrap_band', rows=len(self.data[x_col])):
+                grid = self.grid(x_col)
+                _, low, high = bootstrap_band(self.data[x_col], self.data[y_col], grid, degree, n_resamples,
+                                              confidence, seed, self._factor(x_col, degree))
+            self._bands[key] = (grid, low, high)
+        return self._bands[key]
@@ -0,0 +1,217 @@
+"""
+ingestion.py
+------------
+Shared loader for raw electrolyzer logs (Book1.xlsx workbooks or CSV exports).
+
+The source file is parsed once, every column is normalized to the 20-column
+schema below and coerced to a float dtype, and the result is written to a
+columnar cache (one raw binary file per column plus a JSON manifest).  Later
+runs map only the columns they ask for straight from the cache with
+np.memmap, so nothing is re-parsed and nothing is copied.
+
+The cache entry is keyed by the source path and validated against the
+file's mtime/size and SHA-256 content hash; a changed file is re-parsed
+automatically.  Header and units rows are recognised by having no numeric
+cell at all, in workbooks and CSV files alike.
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+
+# Column names used by every analysis script (same order as Book1.xlsx)
+COLUMNS = [
+    'Power_Level', 'Voltage', 'Current', 'Surface_Area', 'Hydrogen_Volume_Flow',
+    'Valve_Output', 'Temperature', 'Pressure', 'Voltage_Cell', 'Current_Density',
+    'Current_Cell', 'Real_Hydrogen_Volume_Flow_m3', 'Real_Hydrogen_Volume_Flow_kg',
+    'Mass_Flow_kg_s', 'Hydrogen_Mol_Flow', 'Voltage_Efficiency', 'Faraday_Efficiency',
+    'Cell_Efficiency', 'Power', 'Overall_Efficiency'
+]
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_CACHE_DIR = REPO_ROOT / 'data' / 'cache'
+
+MANIFEST_NAME = 'manifest.json'
+CSV_CHUNK_ROWS = 1_000_000  # Rows parsed per chunk when building a cache from CSV
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Return the hex SHA-256 digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_dir(path, cache_dir):
+    # One cache entry per source file; the path hash keeps same-named files apart
+    path_key = hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()[:16]
+    return Path(cache_dir) / f'{Path(path).stem}-{path_key}'
+
+
+def _normalize(df, dtype):
+    """Apply the column schema, coerce to numbers and drop header/units rows."""
+    if df.shape[1] != len(COLUMNS):
+        raise ValueError(f'Expected {len(COLUMNS)} columns, found {df.shape[1]}')
+    df.columns = COLUMNS
+    with stage('ingest.coerce', rows=len(df)):
+        for name in COLUMNS:
+            # Numeric columns come back as floats already; only text columns need coercion
+            if not pd.api.types.is_numeric_dtype(df[name]):
+                df[name] = pd.to_numeric(df[name], errors='coerce')
+        # Header and units rows are the only rows without a single numeric cell
+        df = df.dropna(how='all')
+        return df.astype(dtype, copy=False)
+
+
+def _iter_source_chunks(path, dtype):
+    """Yield normalized DataFrame chunks from a workbook or CSV file."""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.xlsx', '.xlsm', '.xls'):
+        # Workbooks cannot be read incrementally; parse once and cache
+        with stage('ingest.read_excel'):
+            raw = pd.read_excel(path, header=None)
+        yield _normalize(raw, dtype)
+    elif suffix == '.csv':
+        # Header and units lines are parsed as rows and dropped by _normalize, as in workbooks
+        reader = pd.read_csv(path, header=None, chunksize=CSV_CHUNK_ROWS, low_memory=False)
+        for chunk in reader:
+            yield _normalize(chunk, dtype)
+    else:
+        raise ValueError(f'Unsupported input format: {suffix}')
+
+
+def build_cache(path, cache_dir=None, dtype='float64'):
+    """Parse `path` and (re)write its columnar cache entry. Returns the manifest."""
+    cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+    path = Path(path)
+    dtype = np.dtype(dtype)
+    entry = _entry_dir(path, cache_dir)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    stat = path.stat()
+
+    # Write into a temporary directory first so a crash never leaves a half-built entry
+    tmp = Path(tempfile.mkdtemp(prefix=entry.name + '.', dir=entry.parent))
+    try:
+        with stage('ingest.build_cache') as timer:
+            handles = {name: open(tmp / f'{name}.bin', 'wb') for name in COLUMNS}
+            rows = 0
+            try:
+                for chunk in _iter_source_chunks(path, dtype):
+                    for name in COLUMNS:
+                        np.ascontiguousarray(chunk[name].to_numpy(dtype=dtype)).tofile(handles[name])
+                    rows += len(chunk)
+            finally:
+                for fh in handles.values():
+                    fh.close()
+            timer.set_rows(rows)
+
+        manifest = {
+            'source': str(path.resolve()),
+            'sha256': file_sha256(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'dtype': dtype.str,
+            'rows': rows,
+            'columns': COLUMNS,
+        }
+        with open(tmp / MANIFEST_NAME, 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _write_manifest(entry, manifest):
+    with open(entry / MANIFEST_NAME, 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+
+
+def cached_manifest(path, cache_dir=None, dtype='float64'):
+    """Return a valid manifest for `path`, rebuilding the cache if it is stale."""
+    cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+    path = Path(path)
+    entry = _entry_dir(path, cache_dir)
+    try:
+        with open(entry / MANIFEST_NAME) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return build_cache(path, cache_dir, dtype)
+
+    if manifest.get('dtype') != np.dtype(dtype).str:
+        return build_cache(path, cache_dir, dtype)
+
+    stat = path.stat()
+    if manifest['mtime_ns'] == stat.st_mtime_ns and manifest['size'] == stat.st_size:
+        return manifest
+
+    # mtime changed (copy, touch, checkout): only re-parse if the content changed too
+    if manifest['size'] == stat.st_size and manifest['sha256'] == file_sha256(path):
+        manifest['mtime_ns'] = stat.st_mtime_ns
+        _write_manifest(entry, manifest)
+        return manifest
+    return build_cache(path, cache_dir, dtype)
+
+
+def load_columns(path, columns=None, dtype='float64', cache_dir=None, dropna=False):
+    """
+    Load columns of an electrolyzer log as a dict of 1-D NumPy arrays.
+
+    Arrays are read-only memory maps of the cache, so only the requested
+    columns are touched and no data is copied.  With `dropna=True`, rows with a
+    NaN in any requested column are removed (this copies, but only when such
+    rows exist).  `cache_dir` defaults to DEFAULT_CACHE_DIR.
+    """
+    cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+    columns = list(COLUMNS if columns is None else columns)
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown:
+        raise KeyError(f'Unknown columns: {unknown}')
+
+    with stage('ingest.load') as timer:
+        manifest = cached_manifest(path, cache_dir, dtype)
+        entry = _entry_dir(path, cache_dir)
+        data = {}
+        for name in columns:
+            if manifest['rows'] == 0:
+                data[name] = np.empty(0, dtype=manifest['dtype'])
+            else:
+                data[name] = np.memmap(entry / f'{name}.bin', dtype=manifest['dtype'],
+                                       mode='r', shape=(manifest['rows'],))
+
+        if dropna and columns:
+            keep = np.ones(manifest['rows'], dtype=bool)
+            for name in columns:
+                keep &= ~np.isnan(data[name])
+            if not keep.all():
+                data = {name: np.asarray(values[keep]) for name, values in data.items()}
+        timer.set_rows(manifest['rows'])
+    return data
+
+
+def iter_chunks(path, columns=None, chunk_rows=CSV_CHUNK_ROWS, dtype='float64', cache_dir=None):
+    """
+    Yield dicts of column slices covering the log in blocks of `chunk_rows`.
+
+    Slices are views into the memory-mapped cache, so memory use is bounded by
+    the chunk size no matter how large the source file is.
+    """
+    data = load_columns(path, columns, dtype=dtype, cache_dir=cache_dir)
+    rows = len(next(iter(data.values()))) if data else 0
+    for start in range(0, rows, chunk_rows):
+        yield {name: values[start:start + chunk_rows] for name, values in data.items()}
@@ -0,0 +1,254 @@
+"""
+instrumentation.py
+------------------
+Lightweight per-stage timing for the analysis pipeline.
+
+Pipeline steps are wrapped in `stage()` blocks (or the `traced()`
+decorator).  When tracing is off, which is the default, `stage()` returns a
+shared no-op context manager, so the hooks cost one function call.  When it
+is on, every stage records its wall time, row count and peak traced
+allocation (tracemalloc), and the run is written as one JSON trace.  A
+cProfile dump (pstats format, readable by snakeviz, flameprof or gprof2dot
+for flame graphs) can be recorded alongside.  Stages that run in worker
+processes started by parallel.map_processes() are traced in the workers and
+merged into the parent's trace (tagged with the worker's `pid`).
+
+Enable from the environment for the CLI scripts:
+
+    ELECTROLYZER_TRACE=results/trace.json python src/src/plot_all_metrics.py
+    ELECTROLYZER_PROFILE=results/run.prof  python src/src/tafelequation.py
+
+or from a notebook:
+
+    import instrumentation
+    instrumentation.enable('results/slider_trace.json')
+    ...
+    instrumentation.write_trace()
+"""
+
+
+import atexit
+import cProfile
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+class _NullStage:
+    """No-op stand-in returned by stage() while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, tracer, name, rows):
+        self.tracer = tracer
+        self.name = name
+        self.rows = rows
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        tracer = self.tracer
+        self.depth = len(tracer.stack)
+        if tracer.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if tracer.stack:
+                # Fold the enclosing stage's peak so far before resetting the counter
+                parent = tracer.stack[-1]
+                parent.peak = max(parent.peak, peak - parent.base)
+            self.base = current
+            self.peak = 0
+            tracemalloc.reset_peak()
+        tracer.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        tracer = self.tracer
+        tracer.stack.pop()
+        record = {
+            'stage': self.name,
+            'depth': self.depth,
+            'start': self.start - tracer.t0,
+            'seconds': seconds,
+            'rows': self.rows,
+        }
+        if tracer.track_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak - self.base)
+            record['peak_bytes'] = self.peak
+            if tracer.stack:
+                parent = tracer.stack[-1]
+                parent.peak = max(parent.peak, self.base - parent.base + self.peak)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        tracer.records.append(record)
+        return False
+
+
+class Tracer:
+    """Collects stage records for one run."""
+
+    def __init__(self):
+        self.enabled = False
+        self.track_memory = False
+        self.trace_path = None
+        self.profile_path = None
+        self.profiler = None
+        self.records = []
+        self.stack = []
+        self.t0 = time.perf_counter()
+        self.started = None
+
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows)
+
+    def enable(self, trace_path=None, profile_path=None, memory=True):
+        self.enabled = True
+        self.trace_path = trace_path
+        self.profile_path = profile_path
+        self.records = []
+        self.stack = []
+        self.t0 = time.perf_counter()
+        self.started = datetime.now(timezone.utc).isoformat()
+        self.track_memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if profile_path and self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def disable(self):
+        self.enabled = False
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.track_memory = False
+
+    def summary(self):
+        """Total seconds, calls and rows per stage name."""
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0, 'rows': 0})
+            entry['calls'] += 1
+            entry['seconds'] += record['seconds']
+            entry['rows'] += record['rows'] or 0
+            if 'peak_bytes' in record:
+                entry['peak_bytes'] = max(entry.get('peak_bytes', 0), record['peak_bytes'])
+        return totals
+
+    def trace(self):
+        return {
+            'script': Path(sys.argv[0]).name if sys.argv and sys.argv[0] else None,
+            'started': self.started,
+            'wall_seconds': time.perf_counter() - self.t0,
+            'stages': self.records,
+            'summary': self.summary(),
+        }
+
+    def write(self, trace_path=None):
+        """Write the JSON trace (and the cProfile dump, if profiling). Returns the trace path."""
+        path = trace_path or self.trace_path
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w') as fh:
+                json.dump(self.trace(), fh, indent=2)
+        if self.profiler is not None and self.profile_path:
+            Path(self.profile_path).parent.mkdir(parents=True, exist_ok=True)
+            self.profiler.dump_stats(self.profile_path)
+        return path
+
+
+tracer = Tracer()
+
+
+def stage(name, rows=None):
+    """Context manager timing one pipeline stage (no-op while tracing is disabled)."""
+    return tracer.stage(name, rows)
+
+
+def traced(name=None):
+    """Decorator form of stage(); the stage name defaults to the function name."""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Stage(tracer, label, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(trace_path=None, profile_path=None, memory=True):
+    """Turn tracing on for this process (call write_trace() to save it)."""
+    tracer.enable(trace_path, profile_path, memory)
+
+
+def write_trace(trace_path=None):
+    return tracer.write(trace_path)
+
+
+def call_traced(func, memory, *args):
+    """
+    Run func(*args) with tracing on in a worker process.
+
+    Returns (result, stage records, worker t0) for merge_records() in the
+    parent.
+    """
+    tracer.enable(memory=memory)
+    try:
+        result = func(*args)
+        records = [dict(record, pid=os.getpid()) for record in tracer.records]
+        return result, records, tracer.t0
+    finally:
+        tracer.disable()
+
+
+def merge_records(records, t0):
+    """Fold stage records of a worker (started at perf_counter `t0`) into this process's trace."""
+    depth = len(tracer.stack)
+    for record in records:
+        tracer.records.append(dict(record, start=record['start'] + t0 - tracer.t0, depth=record['depth'] + depth))
+
+
+def _enable_from_environment():
+    # Worker processes (rendering, batch fits) inherit the environment; only the
+    # main process writes the trace
+    if multiprocessing.parent_process() is not None:
+        return
+    trace_path = os.environ.get('ELECTROLYZER_TRACE')
+    profile_path = os.environ.get('ELECTROLYZER_PROFILE')
+    if trace_path or profile_path:
+        memory = os.environ.get('ELECTROLYZER_TRACE_MEMORY', '1') != '0'
+        tracer.enable(trace_path, profile_path, memory)
+        atexit.register(tracer.write)
+
+
+_enable_from_environment()
@@ -0,0 +1,193 @@
+"""
+lod.py
+------
+Level-of-detail reduction for dense scatter plots.
+
+Drawing every raw sample as a marker makes render time grow with the log
+size, although a figure can only show a few hundred thousand pixels.  Series
+are therefore reduced to what is visible before they reach matplotlib:
+
+-up to `max_points` samples: drawn unchanged
+-up to `density_threshold` samples: decimated
+    'pixel'  one marker per occupied marker-sized cell, placed at the centroid
+             of the samples in it (every isolated outlier keeps its marker)
+    'minmax' min and max y per pixel column (envelope of x-ordered series)
+    'lttb'   Largest-Triangle-Three-Buckets (shape of x-ordered series)
+-above `density_threshold`: a 2-D count raster drawn with imshow, log scaled,
+ with the samples of sparsely populated cells (outliers) still drawn as markers
+
+All reductions are a few passes of bincount/argsort over the data, so the
+cost of the drawing itself is bounded by the figure resolution.
+"""
+
+
+import numpy as np
+from matplotlib.colors import LinearSegmentedColormap, LogNorm, to_rgba
+
+LOD_MAX_POINTS = 20_000  # Series up to this size are drawn as-is
+DENSITY_THRESHOLD = 1_000_000  # Above this size a density raster is drawn instead of markers
+DENSITY_CELL_PIXELS = 2  # Raster cell size in pixels
+SPARSE_COUNT = 2  # Raster cells with at most this many samples are drawn as markers
+AXIS_MARGIN = 0.05  # Same relative padding as matplotlib's default axes margins
+
+
+def _finite(x, y):
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    keep = np.isfinite(x) & np.isfinite(y)
+    if keep.all():
+        return x, y
+    return x[keep], y[keep]
+
+
+def _limits(values):
+    low, high = values.min(), values.max()
+    pad = (high - low) * AXIS_MARGIN if high > low else max(abs(low), 1.0) * AXIS_MARGIN
+    return low - pad, high + pad
+
+
+def _cells(values, limits, n):
+    low, high = limits
+    index = ((values - low) * (n / (high - low))).astype(np.int64)
+    return np.clip(index, 0, n - 1)
+
+
+def pixel_decimate(x, y, width, height, extent=None):
+    """
+    Collapse points onto a `width` x `height` grid of cells.
+
+    Returns the centroid of the points in every occupied cell, so the output
+    has at most width * height points and no cell that holds data is lost.
+    """
+    x, y = _finite(x, y)
+    if x.size == 0:
+        return x, y
+    xlim, ylim = (extent[:2], extent[2:]) if extent is not None else (_limits(x), _limits(y))
+    cell = _cells(x, xlim, width) * height + _cells(y, ylim, height)
+    counts = np.bincount(cell, minlength=width * height)
+    occupied = counts > 0
+    sum_x = np.bincount(cell, weights=x, minlength=width * height)
+    sum_y = np.bincount(cell, weights=y, minlength=width * height)
+    return sum_x[occupied] / counts[occupied], sum_y[occupied] / counts[occupied]
+
+
+def minmax_decimate(x, y, n_bins):
+    """
+    Keep the minimum and maximum y of every x bin (`n_bins` equal-width bins).
+
+    Returned points are ordered by x, so they can be drawn as a line without
+    losing spikes.
+    """
+    x, y = _finite(x, y)
+    if x.size <= 2 * n_bins:
+        order = np.argsort(x, kind='stable')
+        return x[order], y[order]
+    column = _cells(x, (x.min(), x.max()), n_bins)
+    # Sort by (column, y): the first and last entry of each column are its min and max
+    order = np.lexsort((y, column))
+    column = column[order]
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    stops = np.r_[starts[1:], column.size] - 1
+    keep = order[np.unique(np.concatenate([starts, stops]))]
+    keep = keep[np.argsort(x[keep], kind='stable')]
+    return x[keep], y[keep]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of an x-ordered series.
+
+    Keeps the first and last points and, from each of the `n_out - 2` buckets
+    in between, the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket.
+    """
+    x, y = _finite(x, y)
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Bucket means through prefix sums; bucket b spans [edges[b], edges[b + 1])
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    sizes = np.maximum(np.diff(edges), 1)
+    mean_x = (cx[edges[1:]] - cx[edges[:-1]]) / sizes
+    mean_y = (cy[edges[1:]] - cy[edges[:-1]]) / sizes
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], max(edges[b + 1], edges[b] + 1)
+        bx, by = x[lo:hi], y[lo:hi]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[b + 1]) * (by - ay) - (ax - bx) * (mean_y[b + 1] - ay))
+        previous = lo + int(np.argmax(area))
+        keep[b + 1] = previous
+    return x[keep], y[keep]
+
+
+def density_grid(x, y, width, height, extent=None):
+    """Return (counts[height, width], extent) of a 2-D histogram of the points."""
+    x, y = _finite(x, y)
+    if extent is None:
+        extent = (*_limits(x), *_limits(y))
+    cell = _cells(y, extent[2:], height) * width + _cells(x, extent[:2], width)
+    counts = np.bincount(cell, minlength=width * height).reshape(height, width)
+    return counts, extent
+
+
+def _axes_pixels(ax):
+    bbox = ax.get_window_extent()
+    return max(int(bbox.width), 1), max(int(bbox.height), 1)
+
+
+def _density_cmap(color):
+    rgba = to_rgba(color)
+    return LinearSegmentedColormap.from_list('lod', [(*rgba[:3], 0.25), rgba])
+
+
+def plot_points(ax, x, y, color=None, markersize=5, alpha=None, label=None, method='pixel',
+                max_points=LOD_MAX_POINTS, density_threshold=DENSITY_THRESHOLD):
+    """
+    Draw raw samples as markers, reduced to the axes' resolution when needed.
+
+    Drop-in replacement for `ax.plot(x, y, 'o', ...)`; returns the artist.
+    """
+    x, y = _finite(x, y)
+    n = x.size
+    if n <= max_points:
+        return ax.plot(x, y, 'o', markersize=markersize, color=color, alpha=alpha, label=label)[0]
+
+    width, height = _axes_pixels(ax)
+    # Half a marker per cell: merged markers still overlap, so dense regions stay solid
+    cell = max(markersize * ax.figure.dpi / 72.0 / 2, 1.0)
+    marker_grid = max(int(width / cell), 1), max(int(height / cell), 1)
+
+    if density_threshold is not None and n > density_threshold:
+        extent = (*_limits(x), *_limits(y))
+        shape = max(width // DENSITY_CELL_PIXELS, 1), max(height // DENSITY_CELL_PIXELS, 1)
+        counts, extent = density_grid(x, y, *shape, extent)
+        image = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower', extent=extent, aspect='auto',
+                          interpolation='nearest', cmap=_density_cmap(color or 'C0'),
+                          norm=LogNorm(vmin=1, vmax=max(counts.max(), 2)), alpha=alpha, label=label)
+        # Single raster pixels are easy to miss: keep the sparse samples as markers
+        sparse = counts[_cells(y, extent[2:], shape[1]), _cells(x, extent[:2], shape[0])] <= SPARSE_COUNT
+        if sparse.any():
+            sx, sy = pixel_decimate(x[sparse], y[sparse], *marker_grid, extent)
+            ax.plot(sx, sy, 'o', markersize=markersize, color=color, alpha=alpha)
+        return image
+
+    if method == 'pixel':
+        x, y = pixel_decimate(x, y, *marker_grid)
+    elif method == 'minmax':
+        x, y = minmax_decimate(x, y, width)
+    elif method == 'lttb':
+        x, y = lttb(x, y, min(max_points, 2 * width))
+    else:
+        raise ValueError(f'Unknown LOD method: {method}')
+    return ax.plot(x, y, 'o', markersize=markersize, color=color, alpha=alpha, label=label)[0]
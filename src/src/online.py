@@ -0,0 +1,228 @@
+"""
+online.py
+---------
+Incremental processing of live PLC data.
+
+OnlineAnalyzer accepts raw samples one at a time or in small batches
+(Power_Level, Voltage, Current, Surface_Area, Hydrogen_Mol_Flow,
+Temperature, Pressure) and updates, in O(1) per sample:
+
+-the derived efficiencies of the latest sample (efficiency.compute_efficiencies)
+-running min/max/mean/std of every efficiency
+-running means per Power_Level bin
+-the Tafel regression sums over the fixed log10(j) window (streaming.TAFEL_WINDOW)
+
+The accumulators are the same ones used by streaming.py, so nothing is
+recomputed from history.  Idle samples (no current or no voltage, e.g. the
+stack on standby) would divide by zero and are skipped.  After every update
+the current values are passed to the registered subscribers.
+
+Sample sources:
+
+-replay_workbook(): simulated PLC feed replaying the rows of Book1.xlsx
+-tail_csv(): follow a CSV file the PLC appends to (COLUMNS order)
+-socket_samples(): newline-delimited JSON objects on a local TCP socket
+
+Usage:
+    python src/src/online.py replay data/raw/Book1.xlsx --rate 5 --bin-width 5
+    python src/src/online.py tail plc_log.csv
+    python src/src/online.py socket --port 5020
+"""
+
+
+import argparse
+import json
+import socket
+import sys
+import time
+
+import numpy as np
+
+import efficiency
+from ingestion import COLUMNS, load_columns
+from streaming import TAFEL_WINDOW, BinnedMeans, RegressionSums, RunningStats
+
+# Raw PLC signals an online sample must provide
+SAMPLE_COLUMNS = ['Power_Level', 'Voltage', 'Current', 'Surface_Area', 'Hydrogen_Mol_Flow', 'Temperature', 'Pressure']
+
+EFFICIENCIES = ['Voltage_Efficiency', 'Faraday_Efficiency', 'Cell_Efficiency', 'Overall_Efficiency']
+
+
+class OnlineAnalyzer:
+    """Incrementally updated efficiencies, Power_Level bins and Tafel statistics."""
+
+    def __init__(self, bin_width=1.0, tafel_window=TAFEL_WINDOW, e_rev=efficiency.E0):
+        self.e_rev = e_rev
+        self.tafel_window = tafel_window
+        self.stats = {name: RunningStats() for name in EFFICIENCIES}
+        self.binned = BinnedMeans(EFFICIENCIES, bin_width)
+        self.tafel = RegressionSums()
+        self.samples = 0
+        self.skipped = 0  # Idle samples left out of the statistics
+        self.latest = {}
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """Call `callback(analyzer)` after every update."""
+        self.subscribers.append(callback)
+
+    def update(self, sample):
+        """Fold one sample (a mapping of SAMPLE_COLUMNS to numbers) into the running state."""
+        self.update_batch({name: [sample[name]] for name in SAMPLE_COLUMNS})
+
+    def update_batch(self, batch):
+        """Fold a small batch (a mapping of SAMPLE_COLUMNS to equal-length arrays)."""
+        batch = {name: np.asarray(batch[name], dtype=float) for name in SAMPLE_COLUMNS}
+        idle = ~((batch['Current'] > 0) & (batch['Voltage'] > 0))
+        if idle.any():
+            self.skipped += int(idle.sum())
+            batch = {name: values[~idle] for name, values in batch.items()}
+        size = batch['Power_Level'].size
+        if size == 0:
+            return
+        derived = efficiency.compute_efficiencies(batch, e_rev=self.e_rev)
+        for name in EFFICIENCIES:
+            self.stats[name].update(derived[name])
+        self.binned.update(batch['Power_Level'], derived)
+
+        current_density = derived['Current_Density']
+        positive = current_density > 0
+        log_j = np.log10(current_density[positive])
+        eta = efficiency.overpotential(derived['Voltage_Cell'][positive])
+        low, high = self.tafel_window
+        region = (log_j > low) & (log_j < high) & np.isfinite(eta)
+        self.tafel.update(log_j[region], eta[region])
+
+        self.samples += size
+        self.latest = {'Power_Level': float(batch['Power_Level'][-1])}
+        self.latest.update({name: float(values[-1]) for name, values in derived.items()})
+        for callback in self.subscribers:
+            callback(self)
+
+    def bin_means(self, name):
+        """(Power_Level bins, running means, counts) of one efficiency."""
+        return self.binned.means(name)
+
+    def snapshot(self):
+        """Current values as a JSON-serializable dict."""
+        tafel = self.tafel.result()
+        return {
+            'samples': self.samples,
+            'skipped': self.skipped,
+            'latest': self.latest,
+            'stats': {name: {k: float(v) for k, v in s.as_dict().items()} for name, s in self.stats.items()},
+            'tafel': {k: float(v) for k, v in tafel.items()},
+        }
+
+
+def replay_workbook(path, rate=None, batch_size=1):
+    """Simulated PLC feed: yield the rows of a workbook as samples (or batches), `rate` per second."""
+    data = load_columns(path, SAMPLE_COLUMNS, dropna=True)
+    rows = len(data['Power_Level'])
+    for start in range(0, rows, batch_size):
+        chunk = {name: np.asarray(values[start:start + batch_size]) for name, values in data.items()}
+        if batch_size == 1:
+            chunk = {name: float(values[0]) for name, values in chunk.items()}
+        yield chunk
+        if rate:
+            time.sleep(batch_size / rate)
+
+
+def _parse_csv_line(line):
+    fields = line.strip().split(',')
+    if len(fields) != len(COLUMNS):
+        return None
+    try:
+        values = [float(field) for field in fields]
+    except ValueError:
+        return None  # Header or units line
+    return dict(zip(COLUMNS, values))
+
+
+def tail_csv(path, poll_interval=0.5, from_start=True):
+    """Follow a CSV log the PLC appends to and yield each complete new row as a sample."""
+    with open(path, 'r', newline='') as fh:
+        if not from_start:
+            fh.seek(0, 2)
+        pending = ''
+        while True:
+            line = fh.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            pending += line
+            if not pending.endswith('\n'):
+                continue  # Row still being written
+            sample = _parse_csv_line(pending)
+            pending = ''
+            if sample is not None:
+                yield sample
+
+
+def _parse_json_sample(line):
+    """A sample dict with every SAMPLE_COLUMNS field as float, or None if the line is not one."""
+    try:
+        sample = json.loads(line)
+        return {name: float(sample[name]) for name in SAMPLE_COLUMNS}
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def socket_samples(host='127.0.0.1', port=5020):
+    """Listen on a local TCP socket and yield newline-delimited JSON samples from each client."""
+    with socket.create_server((host, port)) as server:
+        while True:
+            conn, _ = server.accept()
+            with conn, conn.makefile('r') as stream:
+                for line in stream:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    sample = _parse_json_sample(line)
+                    if sample is None:
+                        print(f'Skipping malformed sample: {line[:80]}', file=sys.stderr)
+                    else:
+                        yield sample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Online efficiency and Tafel statistics from live PLC data.')
+    # Options shared by every source, accepted after the source name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--bin-width', type=float, default=1.0, help='Power_Level bin width (%%)')
+    sub = parser.add_subparsers(dest='source', required=True)
+    replay = sub.add_parser('replay', parents=[common], help='Replay a workbook as a simulated PLC feed')
+    replay.add_argument('path')
+    replay.add_argument('--rate', type=float, default=None, help='Samples per second (default: as fast as possible)')
+    replay.add_argument('--batch-size', type=int, default=1)
+    tail = sub.add_parser('tail', parents=[common], help='Follow a CSV file the PLC appends to')
+    tail.add_argument('path')
+    listen = sub.add_parser('socket', parents=[common], help='Read newline-delimited JSON samples from a local socket')
+    listen.add_argument('--host', default='127.0.0.1')
+    listen.add_argument('--port', type=int, default=5020)
+    args = parser.parse_args(argv)
+
+    analyzer = OnlineAnalyzer(bin_width=args.bin_width)
+    analyzer.subscribe(lambda a: print(json.dumps(a.snapshot()['latest']), flush=True))
+
+    if args.source == 'replay':
+        feed = replay_workbook(args.path, args.rate, args.batch_size)
+    elif args.source == 'tail':
+        feed = tail_csv(args.path)
+    else:
+        feed = socket_samples(args.host, args.port)
+
+    batched = args.source == 'replay' and args.batch_size > 1
+    try:
+        for sample in feed:
+            if batched:
+                analyzer.update_batch(sample)
+            else:
+                analyzer.update(sample)
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(analyzer.snapshot(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+optimizer.py
+------------
+Operating-point optimizer: the power setpoint (and stack temperature) that
+meets a hydrogen production target most efficiently.
+
+The reverse of the slider in combinedplotswithslider.py.  Least-squares
+polynomial surfaces over (Power_Level, Temperature) are fitted for
+Real_Hydrogen_Volume_Flow_m3 and the efficiencies, the same kind of
+polynomial smoothing the plots use, extended by a low-degree temperature
+term.  When the log barely covers a temperature range, the surfaces fall back
+to Power_Level alone.  High-degree polynomials overshoot between and beyond
+the measured setpoints, so every surface is clipped to the range measured at
+the neighbouring Power_Level values; a recommendation never promises more
+than the log has shown.
+
+The surfaces are evaluated once on a dense setpoint grid.  Grid points are
+sorted by hydrogen flow, and a suffix arg-max stores for every position the
+best point whose flow is at least that large.  A query is then one
+searchsorted into that table, so thousands of targets are answered in one
+vectorized call.
+
+Usage:
+    python src/src/optimizer.py data/raw/Book1.xlsx --target 0.2 0.3 0.4
+    python src/src/optimizer.py data/raw/Book1.xlsx --target 0.3 --objective specific_energy --temperature 60
+"""
+
+
+import argparse
+from collections import namedtuple
+
+import numpy as np
+from numpy.polynomial import polynomial as P
+from numpy.polynomial import polyutils as pu
+
+import efficiency
+from fitting import WINDOW, ScaledLeastSquares, fit_domain
+from ingestion import load_columns
+
+FLOW = 'Real_Hydrogen_Volume_Flow_m3'
+EFFICIENCIES = ['Overall_Efficiency', 'Cell_Efficiency', 'Voltage_Efficiency', 'Faraday_Efficiency']
+OBJECTIVES = EFFICIENCIES + ['specific_energy']  # Efficiencies are maximized, specific energy (kWh/kg) minimized
+MIN_TEMPERATURE_SPAN = 5.0  # °C covered by the log before temperature enters the surfaces
+
+Setpoints = namedtuple('Setpoints', [
+    'power_level', 'temperature', 'flow', 'objective', 'overall_efficiency', 'specific_energy', 'feasible'
+])
+
+
+class Surface:
+    """Least-squares polynomial z(Power_Level, Temperature) of given degrees in each variable."""
+
+    def __init__(self, power_level, temperature, values, power_degree, temperature_degree):
+        self.power_map = pu.mapparms(fit_domain(power_level), WINDOW)
+        self.temperature_map = pu.mapparms(fit_domain(temperature), WINDOW)
+        vander = P.polyvander2d(*self._map(power_level, temperature), [power_degree, temperature_degree])
+        coef = ScaledLeastSquares(vander).solve(np.asarray(values, dtype=float)[:, None])[:, 0]
+        self.coef = coef.reshape(power_degree + 1, temperature_degree + 1)
+
+    def _map(self, power_level, temperature):
+        (p_off, p_scl), (t_off, t_scl) = self.power_map, self.temperature_map
+        return (p_off + p_scl * np.asarray(power_level, dtype=float),
+                t_off + t_scl * np.asarray(temperature, dtype=float))
+
+    def __call__(self, power_level, temperature):
+        return P.polyval2d(*self._map(power_level, temperature), self.coef)
+
+
+def _envelope(power_level, values, power_grid):
+    """
+    Per grid power: the min and max of `values` measured at the nearest
+    Power_Level on either side (at a measured level, its own range).
+    """
+    levels, inverse = np.unique(power_level, return_inverse=True)
+    low = np.full(levels.size, np.inf)
+    high = np.full(levels.size, -np.inf)
+    np.minimum.at(low, inverse, values)
+    np.maximum.at(high, inverse, values)
+    left = np.clip(np.searchsorted(levels, power_grid, side='right') - 1, 0, levels.size - 1)
+    right = np.clip(np.searchsorted(levels, power_grid, side='left'), 0, levels.size - 1)
+    return np.minimum(low[left], low[right]), np.maximum(high[left], high[right])
+
+
+def _degrees(power_level, temperature, power_degree, temperature_degree):
+    """Cap the requested degrees by the distinct values and samples available."""
+    power_degree = min(power_degree, np.unique(power_level).size - 1)
+    if np.ptp(temperature) < MIN_TEMPERATURE_SPAN:
+        temperature_degree = 0
+    temperature_degree = min(temperature_degree, np.unique(temperature).size - 1)
+    while temperature_degree > 0 and (power_degree + 1) * (temperature_degree + 1) > power_level.size:
+        temperature_degree -= 1
+    return max(power_degree, 0), max(temperature_degree, 0)
+
+
+def _suffix_best(flows, scores):
+    """
+    Per row: flows sorted ascending and, for every sorted position, the column
+    of the best score among points with at least that flow.
+    """
+    order = np.argsort(flows, axis=1, kind='stable')
+    flows = np.take_along_axis(flows, order, axis=1)
+    reverse = np.take_along_axis(scores, order, axis=1)[:, ::-1]
+    # A position holds the running maximum exactly when it sets a new (or tied) best
+    positions = np.arange(reverse.shape[1])
+    leader = np.where(reverse == np.maximum.accumulate(reverse, axis=1), positions, 0)
+    leader = np.maximum.accumulate(leader, axis=1)[:, ::-1]
+    best = np.take_along_axis(order, reverse.shape[1] - 1 - leader, axis=1)
+    return flows, best
+
+
+class OperatingPointOptimizer:
+    """
+    Best setpoints for hydrogen production targets.
+
+    `data` maps column names to equal-length arrays with Power_Level,
+    Temperature, Real_Hydrogen_Volume_Flow_m3 and the efficiency columns (the
+    dict from ingestion.load_columns with dropna=True).  The grid spans the
+    measured ranges unless `power_range` / `temperature_range` narrow it.
+    Among setpoints with equal (clipped) objective values the one with the
+    lowest flow that still meets the target is returned.
+    """
+
+    def __init__(self, data, objective='Overall_Efficiency', power_degree=10, temperature_degree=2,
+                 power_points=1001, temperature_points=41, power_range=None, temperature_range=None):
+        if objective not in OBJECTIVES:
+            raise ValueError(f'Unknown objective {objective!r}; choose from {OBJECTIVES}')
+        self.objective = objective
+        power_level = np.asarray(data['Power_Level'], dtype=float)
+        temperature = np.asarray(data['Temperature'], dtype=float)
+        self.power_degree, self.temperature_degree = _degrees(power_level, temperature, power_degree,
+                                                              temperature_degree)
+        surface_columns = [FLOW, 'Overall_Efficiency'] + [objective] * (objective in EFFICIENCIES)
+        self.surfaces = {name: Surface(power_level, temperature, data[name], self.power_degree,
+                                       self.temperature_degree) for name in dict.fromkeys(surface_columns)}
+
+        power_range = power_range or (power_level.min(), power_level.max())
+        if self.temperature_degree == 0:
+            # The surfaces do not depend on temperature: report the mean of the log
+            self.temperature_grid = np.array([temperature.mean()])
+        else:
+            temperature_range = temperature_range or (temperature.min(), temperature.max())
+            self.temperature_grid = np.linspace(*temperature_range, temperature_points)
+        self.power_grid = np.linspace(*power_range, power_points)
+
+        # Rows: temperatures, columns: power levels; surfaces are clipped to the measured envelope
+        power, temp = np.meshgrid(self.power_grid, self.temperature_grid)
+        grids = {name: np.clip(surface(power, temp),
+                               *_envelope(power_level, np.asarray(data[name], dtype=float), self.power_grid))
+                 for name, surface in self.surfaces.items()}
+        self.flow = grids[FLOW]
+        self.overall = grids['Overall_Efficiency']
+        if objective == 'specific_energy':
+            self.value = efficiency.specific_energy(self.overall)
+            score = -self.value
+        else:
+            self.value = grids[objective]
+            score = self.value
+        score = np.where(np.isfinite(score), score, -np.inf)
+
+        # Fixed temperature: one table per grid row; free temperature: one table over the whole grid
+        self._row_flows, self._row_best = _suffix_best(self.flow, score)
+        all_flows, all_best = _suffix_best(self.flow.reshape(1, -1), score.reshape(1, -1))
+        self._all_flows, self._all_best = all_flows[0], all_best[0]
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        data = load_columns(path, ['Power_Level', 'Temperature', FLOW] + EFFICIENCIES, dropna=True)
+        return cls(data, **kwargs)
+
+    def query(self, target_flow, temperature=None):
+        """
+        Best setpoints producing at least `target_flow` (m³/h, scalar or array).
+
+        With `temperature` (scalar or array, °C) the setpoint is restricted to
+        the nearest grid temperature; otherwise temperature is optimized too.
+        Infeasible targets (above the largest attainable flow) return NaN with
+        `feasible` False.
+        """
+        target = np.atleast_1d(np.asarray(target_flow, dtype=float))
+        if temperature is None:
+            position = np.searchsorted(self._all_flows, target, side='left')
+            feasible = position < self._all_flows.size
+            flat = self._all_best[np.minimum(position, self._all_flows.size - 1)]
+        else:
+            grid = self.temperature_grid
+            step = grid[1] - grid[0] if grid.size > 1 else 1.0
+            row = np.clip(np.rint((np.asarray(temperature, dtype=float) - grid[0]) / step), 0, grid.size - 1)
+            target, row = np.broadcast_arrays(target, row.astype(np.int64))
+            # Rows are sorted independently; offsetting each row by its index keeps one global searchsorted
+            flows = self._row_flows
+            low, span = flows[:, 0].min(), np.ptp(flows) + 1.0
+            keys = (np.arange(grid.size)[:, None] * span + (flows - low)).ravel()
+            columns = flows.shape[1]
+            position = np.searchsorted(keys, row * span + np.maximum(target - low, 0.0), side='left')
+            feasible = position < (row + 1) * columns
+            column = self._row_best.ravel()[np.minimum(position, keys.size - 1)]
+            flat = row * columns + column
+
+        rows, columns = np.unravel_index(flat, self.flow.shape)
+        result = Setpoints(
+            power_level=self.power_grid[columns],
+            temperature=self.temperature_grid[rows],
+            flow=self.flow[rows, columns],
+            objective=self.value[rows, columns],
+            overall_efficiency=self.overall[rows, columns],
+            specific_energy=efficiency.specific_energy(self.overall[rows, columns]),
+            feasible=feasible,
+        )
+        return Setpoints(*(np.where(feasible, field, np.nan) for field in result[:-1]), feasible)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Best power setpoints for hydrogen production targets.')
+    parser.add_argument('source', help='Workbook or CSV log used to fit the surfaces')
+    parser.add_argument('--target', type=float, nargs='+', required=True, help='Hydrogen flow targets (m³/h)')
+    parser.add_argument('--temperature', type=float, default=None, help='Fix the stack temperature (°C)')
+    parser.add_argument('--objective', choices=OBJECTIVES, default='Overall_Efficiency')
+    args = parser.parse_args(argv)
+
+    optimizer = OperatingPointOptimizer.from_file(args.source, objective=args.objective)
+    result = optimizer.query(args.target, args.temperature)
+    print(f'{"target":>8} {"power %":>8} {"temp °C":>8} {"flow":>8} {"ηoverall":>9} {"kWh/kg":>8}')
+    for target, *fields in zip(args.target, result.power_level, result.temperature, result.flow,
+                               result.overall_efficiency, result.specific_energy):
+        print(f'{target:8.4f} ' + ' '.join(f'{value:8.3f}' for value in fields))
+
+
+if __name__ == '__main__':
+    main()
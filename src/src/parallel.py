@@ -0,0 +1,42 @@
+"""
+parallel.py
+-----------
+Process-pool map shared by the batch runners (tafel_batch, results_store,
+rendering).
+
+map_processes() calls a module-level function once per job, in the calling
+process when only one worker is allowed and in a ProcessPoolExecutor
+otherwise, and returns the results in job order.  While tracing is enabled,
+the workers trace their stages and send the records back with each result,
+so the parent's trace also covers the work done in the pool.
+"""
+
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import call_traced, merge_records, tracer
+
+
+def map_processes(func, jobs, processes=None):
+    """
+    Return [func(*job) for job in jobs], computed in worker processes when more than one is allowed.
+
+    `processes` defaults to the number of CPUs and is capped at the number of
+    jobs; pass 1 to run in the calling process.  `func` must be importable by
+    the workers (a module-level function).
+    """
+    jobs = [tuple(job) for job in jobs]
+    workers = max(1, min(processes or os.cpu_count() or 1, len(jobs)))
+    if workers == 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if not tracer.enabled:
+            return list(pool.map(func, *zip(*jobs)))
+        outputs = list(pool.map(functools.partial(call_traced, func, tracer.track_memory), *zip(*jobs)))
+    results = []
+    for result, records, t0 in outputs:
+        merge_records(records, t0)
+        results.append(result)
+    return results
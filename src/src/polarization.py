@@ -0,0 +1,256 @@
+"""
+polarization.py
+---------------
+Physical polarization-curve model of the electrolyzer cell.
+
+    V(j) = E_rev + b·asinh(j / 2j0) + R_ohm·j - c·ln(1 - j / j_lim)
+
+-Activation: Butler–Volmer in its symmetric asinh form (b = RT/αF, j0 = exchange current density)
+-Ohmic: area-specific resistance R_ohm
+-Concentration: mass-transport term with limiting current density j_lim
+
+Voltage_Cell is fitted against Current_Density with a Levenberg–Marquardt
+solver that uses an analytic Jacobian and is vectorized across curves: many
+curves (padded to a common length and masked) are solved in one call, with
+one batched linear solve per iteration for all of them.
+
+Current densities are passed in the unit of the Current_Density column
+(mA/cm²); fitted j0 and j_lim are reported in A/cm² and R_ohm in Ω·cm².
+"""
+
+
+from collections import namedtuple
+
+import numpy as np
+
+import efficiency
+from instrumentation import traced
+
+CURRENT_SCALE = 1e-3  # mA/cm² -> A/cm²
+
+# Bounds of the transformed parameters [ln j0, ln b, R_ohm, ln c, u]; they keep
+# the solver in a physical range where weakly identified terms would drift off
+THETA_LOW = np.array([np.log(1e-12), np.log(1e-3), 0.0, np.log(1e-6), np.log(0.05)])
+THETA_HIGH = np.array([np.log(10.0), np.log(0.5), np.inf, np.log(1.0), np.log(100.0)])
+PARAMETERS = THETA_LOW.size  # Parameters of the full model (with the concentration term)
+
+# Start values of (j_lim / j_max - 1) for the concentration term
+J_LIM_STARTS = np.array([0.1, 0.5, 1.0, 5.0])
+
+GRADIENT_TOL = 1e-8  # Stop once the residuals are this close to orthogonal to every Jacobian column
+STEP_TOL = 1e-8  # Stop on an accepted step that moves no transformed parameter by more than this
+MAX_DAMPING = 1e12  # A curve whose damping grows past this without an accepted step has stalled
+R_OHM_MAX_REL_STDERR = 0.1  # Larger relative standard errors report R_ohm as unidentified
+
+# converged is False for curves with no more valid points than parameters and
+# for curves that stalled (no step accepted even with heavy damping, reported
+# by `stalled`).  r_ohm_identified is False when the data cannot separate R_ohm
+# from the other terms (typically a concentration term that is nearly linear
+# over the measured range); r_ohm then only serves predict() and should not be
+# reported
+PolarizationModel = namedtuple('PolarizationModel', [
+    'e_rev', 'j0', 'b', 'r_ohm', 'c_conc', 'j_lim', 'rmse', 'iterations', 'converged',
+    'r_ohm_stderr', 'r_ohm_identified', 'stalled'
+])
+
+
+def cell_voltage(current_density, e_rev, j0, b, r_ohm, c_conc=0.0, j_lim=np.inf):
+    """Evaluate the polarization model; `current_density` in mA/cm², parameters as fitted."""
+    j = np.asarray(current_density, dtype=float) * CURRENT_SCALE
+    voltage = e_rev + b * np.arcsinh(j / (2 * j0)) + r_ohm * j
+    if c_conc:
+        voltage = voltage - c_conc * np.log1p(-j / j_lim)
+    return voltage
+
+
+def predict(model, current_density):
+    """Cell voltage of a fitted PolarizationModel at `current_density` (mA/cm²)."""
+    return cell_voltage(current_density, model.e_rev, model.j0, model.b, model.r_ohm, model.c_conc, model.j_lim)
+
+
+def _unpack(theta, j_max):
+    # theta = [ln j0, ln b, R_ohm, ln c, u] with j_lim = j_max * (1 + e^u) > j_max
+    j0 = np.exp(theta[:, 0:1])
+    b = np.exp(theta[:, 1:2])
+    r_ohm = theta[:, 2:3]
+    if theta.shape[1] == 3:
+        return j0, b, r_ohm, None, None
+    c = np.exp(theta[:, 3:4])
+    j_lim = j_max * (1 + np.exp(theta[:, 4:5]))
+    return j0, b, r_ohm, c, j_lim
+
+
+def _residuals(theta, j, v, mask, e_rev, j_max, jacobian=True):
+    """Masked residuals (B, N) and, optionally, the analytic Jacobian (B, N, k)."""
+    j0, b, r_ohm, c, j_lim = _unpack(theta, j_max)
+    z = j / (2 * j0)
+    asinh = np.arcsinh(z)
+    model = e_rev + b * asinh + r_ohm * j
+    if c is not None:
+        ratio = np.minimum(j / j_lim, 1 - 1e-12)
+        conc = -c * np.log1p(-ratio)
+        model = model + conc
+    resid = np.where(mask, model - v, 0.0)
+    if not jacobian:
+        return resid, None
+
+    columns = [-b * z / np.sqrt(1 + z * z), b * asinh, j]
+    if c is not None:
+        dlim_du = j_max * np.exp(theta[:, 4:5])
+        columns += [conc, -c * ratio / (1 - ratio) * dlim_du / j_lim]
+    jac = np.stack(columns, axis=-1) * mask[..., None]
+    return resid, jac
+
+
+def _initial_guess(j, v, mask):
+    """Activation + ohmic start values; R_ohm from a linear fit of the upper half of each curve."""
+    batch = j.shape[0]
+    theta = np.zeros((batch, 3))
+    for row in range(batch):
+        jj, vv = j[row, mask[row]], v[row, mask[row]]
+        if jj.size == 0:
+            continue
+        upper = jj >= np.median(jj)
+        slope = np.polyfit(jj[upper], vv[upper], 1)[0] if upper.sum() >= 2 and np.ptp(jj[upper]) > 0 else 0.0
+        theta[row, 2] = max(slope, 0.0)
+    theta[:, 0] = np.log(1e-3)  # j0 = 1 mA/cm²
+    theta[:, 1] = np.log(0.03)  # b = 30 mV
+    return theta
+
+
+def _levenberg_marquardt(theta, j, v, mask, e_rev, j_max, max_iter, tol):
+    """Bounded LM iterations run for every curve at once; returns theta, cost, iterations, active, stalled."""
+    batch, k = theta.shape
+    low, high = THETA_LOW[:k], THETA_HIGH[:k]
+    theta = np.clip(theta, low, high)
+    damping = np.full(batch, 1e-3)
+    resid, jac = _residuals(theta, j, v, mask, e_rev, j_max)
+    cost = np.einsum('bn,bn->b', resid, resid)
+    active = np.ones(batch, dtype=bool)
+    stalled = np.zeros(batch, dtype=bool)
+    iterations = np.zeros(batch, dtype=int)
+
+    for _ in range(max_iter):
+        # Only curves still iterating are solved; finished ones keep their state
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+        th, r, jc, c, d = theta[rows], resid[rows], jac[rows], cost[rows], damping[rows]
+        jtj = np.einsum('bni,bnj->bij', jc, jc)
+        grad = np.einsum('bni,bn->bi', jc, r)
+        # Parameters on a bound that the descent direction pushes outwards are held
+        # fixed for this step; clipping a free step instead would make LM crawl
+        free = ~(((th <= low) & (grad > 0)) | ((th >= high) & (grad < 0)))
+        grad = np.where(free, grad, 0.0)
+        jtj = jtj * (free[:, :, None] & free[:, None, :])
+        diag = np.einsum('bii->bi', jtj)
+        # Gradient test: cosine between the residual vector and every free Jacobian column
+        cosine = np.abs(grad) / np.sqrt(np.maximum(diag * c[:, None], 1e-300))
+        flat = cosine.max(axis=1) <= GRADIENT_TOL
+
+        lhs = jtj + (d[:, None] * (diag + 1e-12) + ~free)[:, :, None] * np.eye(k)
+        step = -np.linalg.solve(lhs, grad[..., None])[..., 0]
+        trial = np.clip(th + step, low, high)
+        trial_resid, trial_jac = _residuals(trial, j[rows], v[rows], mask[rows], e_rev[rows], j_max[rows])
+        trial_cost = np.einsum('bn,bn->b', trial_resid, trial_resid)
+        better = ~flat & np.isfinite(trial_cost) & (trial_cost < c)
+
+        improvement = np.where(better, c - trial_cost, 0.0)
+        moved = np.abs(trial - th).max(axis=1)
+        accepted = rows[better]
+        theta[accepted] = trial[better]
+        resid[accepted] = trial_resid[better]
+        jac[accepted] = trial_jac[better]
+        cost[accepted] = trial_cost[better]
+        # Accepted steps relax the damping, rejected ones increase it
+        damping[rows] = np.where(better, np.maximum(d * 0.3, 1e-10), np.where(flat, d, d * 10.0))
+        iterations[rows] += ~flat
+
+        # Converged on a vanishing gradient, or when an accepted step barely lowers the
+        # cost or barely moves the parameters; stalled when no step is accepted even
+        # with heavy damping
+        converged = flat | (better & ((improvement <= tol * cost[rows]) | (moved <= STEP_TOL)))
+        stalled[rows] = ~converged & (damping[rows] > MAX_DAMPING)
+        active[rows] = ~(converged | stalled[rows])
+    return theta, cost, iterations, active, stalled
+
+
+def _r_ohm_stderr(theta, j, v, mask, e_rev, j_max):
+    """Standard error of R_ohm from the Jacobian at the solution (pseudo-inverse of JᵀJ)."""
+    resid, jac = _residuals(theta, j, v, mask, e_rev, j_max)
+    dof = np.maximum(mask.sum(axis=1) - theta.shape[1], 1)
+    s2 = np.einsum('bn,bn->b', resid, resid) / dof
+    covariance = np.linalg.pinv(np.einsum('bni,bnj->bij', jac, jac), hermitian=True)
+    return np.sqrt(np.maximum(s2 * covariance[:, 2, 2], 0.0))
+
+
+@traced('polarization_fit')
+def fit_polarization_batch(current_densities, voltages, e_rev=efficiency.E0, concentration=True,
+                           max_iter=1000, tol=1e-12):
+    """
+    Fit many polarization curves in one vectorized Levenberg–Marquardt solve.
+
+    `current_densities` and `voltages` are sequences of 1-D arrays (one pair
+    per curve, any lengths; current density in mA/cm²).  `e_rev` is a scalar
+    or one value per curve.  Iterations stop on a small relative cost
+    improvement (`tol`), a small step or a vanishing gradient, and a curve
+    whose damping exceeds MAX_DAMPING is reported as stalled.  Returns a
+    list of PolarizationModel.
+    """
+    curves = [(np.asarray(jj, dtype=float), np.asarray(vv, dtype=float))
+              for jj, vv in zip(current_densities, voltages)]
+    batch = len(curves)
+    length = max(jj.size for jj, _ in curves)
+    j = np.zeros((batch, length))
+    v = np.zeros((batch, length))
+    mask = np.zeros((batch, length), dtype=bool)
+    for row, (jj, vv) in enumerate(curves):
+        keep = np.isfinite(jj) & np.isfinite(vv) & (jj > 0)
+        n = keep.sum()
+        j[row, :n] = jj[keep] * CURRENT_SCALE
+        v[row, :n] = vv[keep]
+        mask[row, :n] = True
+    # Padding uses j = j_max so every term stays finite; it is masked out of the fit
+    j_max = np.array([[j[row, mask[row]].max() if mask[row].any() else 1.0] for row in range(batch)])
+    j = np.where(mask, j, j_max)
+    e_rev = np.broadcast_to(np.asarray(e_rev, dtype=float), (batch,))[:, None]
+
+    theta, cost, iterations, active, stalled = _levenberg_marquardt(
+        _initial_guess(j, v, mask), j, v, mask, e_rev, j_max, max_iter, tol)
+    if concentration:
+        # Continuation: start the full model from the activation + ohmic solution,
+        # with several limiting-current guesses solved side by side (c = 10 mV)
+        starts = len(J_LIM_STARTS)
+        start = np.column_stack([np.tile(theta, (starts, 1)), np.full(starts * batch, np.log(1e-2)),
+                                 np.repeat(np.log(J_LIM_STARTS), batch)])
+        tile = lambda a: np.tile(a, (starts, 1))
+        theta, cost, more, active, stalled = _levenberg_marquardt(
+            start, tile(j), tile(v), tile(mask), tile(e_rev), tile(j_max), max_iter, tol)
+        best = np.argmin(cost.reshape(starts, batch), axis=0) * batch + np.arange(batch)
+        theta, cost, active, stalled = theta[best], cost[best], active[best], stalled[best]
+        iterations += more[best]
+
+    j0, b, r_ohm, c, j_lim = _unpack(theta, j_max)
+    # With no more points than parameters the residuals vanish and nothing is identified
+    counts = mask.sum(axis=1)
+    determined = counts > theta.shape[1]
+    r_ohm_stderr = np.where(determined, _r_ohm_stderr(theta, j, v, mask, e_rev, j_max), np.nan)
+    identified = determined & (r_ohm_stderr <= R_OHM_MAX_REL_STDERR * np.abs(r_ohm[:, 0]))
+    converged = determined & ~active & ~stalled
+    rmse = np.where(counts > 0, np.sqrt(cost / np.maximum(counts, 1)), np.nan)
+    models = []
+    for row in range(batch):
+        models.append(PolarizationModel(
+            e_rev=float(e_rev[row, 0]), j0=float(j0[row, 0]), b=float(b[row, 0]), r_ohm=float(r_ohm[row, 0]),
+            c_conc=float(c[row, 0]) if c is not None else 0.0,
+            j_lim=float(j_lim[row, 0]) if j_lim is not None else np.inf,
+            rmse=float(rmse[row]), iterations=int(iterations[row]), converged=bool(converged[row]),
+            r_ohm_stderr=float(r_ohm_stderr[row]), r_ohm_identified=bool(identified[row]),
+            stalled=bool(stalled[row]),
+        ))
+    return models
+
+
+def fit_polarization(current_density, voltage_cell, e_rev=efficiency.E0, concentration=True, max_iter=1000):
+    """Fit a single polarization curve (Current_Density in mA/cm², Voltage_Cell in V)."""
+    return fit_polarization_batch([current_density], [voltage_cell], e_rev, concentration, max_iter)[0]
@@ -0,0 +1,78 @@
+"""
+rendering.py
+------------
+Parallel, headless rendering of the metric plots.
+
+Each plot is described by a PlotSpec (raw points, smoothed curve, labels and
+output file name).  Specs are drawn with matplotlib's object-oriented Agg API
+(Figure + FigureCanvasAgg) instead of pyplot's global state, so no figure
+manager keeps figures alive: every figure is released as soon as it has been
+saved.  render_all() spreads the specs over a process pool, so throughput
+scales with the number of cores while each worker only ever holds one figure.
+Raw points go through lod.plot_points(), so dense series are decimated or
+drawn as a density raster and render time does not grow with the log size.
+"""
+
+
+from collections import namedtuple
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from ingestion import REPO_ROOT
+from instrumentation import stage
+from lod import DENSITY_THRESHOLD, LOD_MAX_POINTS, plot_points
+from parallel import map_processes
+
+DEFAULT_PLOT_DIR = REPO_ROOT / 'results' / 'plots'
+
+# band_low/band_high: optional confidence band around the smoothed curve (on smooth_x)
+PlotSpec = namedtuple('PlotSpec', [
+    'filename', 'title', 'xlabel', 'ylabel', 'x', 'y', 'smooth_x', 'smooth_y', 'color', 'label',
+    'band_low', 'band_high'
+], defaults=(None, None))
+
+
+def render_spec(spec, out_dir=DEFAULT_PLOT_DIR, dpi=100, max_points=LOD_MAX_POINTS,
+                density_threshold=DENSITY_THRESHOLD):
+    """Draw one PlotSpec to `out_dir/spec.filename` and return the output path."""
+    fig = Figure(dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    plot_points(ax, spec.x, spec.y, spec.color, markersize=5, max_points=max_points,
+                density_threshold=density_threshold)
+    if spec.smooth_x is not None:
+        ax.plot(spec.smooth_x, spec.smooth_y, '-', label=spec.label, color=spec.color)
+        if spec.band_low is not None:
+            ax.fill_between(spec.smooth_x, spec.band_low, spec.band_high, color=spec.color, alpha=0.2, linewidth=0)
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    ax.grid(True)
+
+    path = Path(out_dir) / spec.filename
+    with stage('savefig', rows=len(spec.x)):
+        fig.savefig(path, dpi=dpi)
+    # Drop the artists explicitly so the worker's memory is returned before the next plot
+    fig.clear()
+    return str(path)
+
+
+def render_all(specs, out_dir=DEFAULT_PLOT_DIR, processes=None, dpi=100, max_points=LOD_MAX_POINTS,
+               density_threshold=DENSITY_THRESHOLD):
+    """
+    Render every spec, in parallel worker processes when more than one is allowed.
+
+    `processes` defaults to the number of CPUs (capped at the number of
+    specs); pass 1 to render in the calling process.  Series longer than
+    `max_points` are decimated and series longer than `density_threshold`
+    are drawn as density rasters (None disables the raster).  Returns the
+    output paths in the order of `specs`.
+    """
+    specs = list(specs)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    jobs = [(spec, out_dir, dpi, max_points, density_threshold) for spec in specs]
+    # Worker savefig stages are merged into the trace under this stage
+    with stage('render', rows=sum(len(spec.x) for spec in specs)):
+        return map_processes(render_spec, jobs, processes)
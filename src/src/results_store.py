@@ -0,0 +1,336 @@
+"""
+results_store.py
+----------------
+Persistent cross-run results store (SQLite, results/runs.sqlite).
+
+Every analysed run is reduced once to its derived metrics and kept in two
+tables:
+
+-runs            one row per run: stack, date, mean temperature and pressure,
+                 Tafel slope / j0 (with confidence intervals) and the ohmic
+                 resistance of the polarization model
+-binned_metrics  efficiencies, Voltage_Cell and Current_Density averaged per
+                 Power_Level bin, keyed (metric, power_level, run_id)
+
+Efficiencies use E0 = 1.23 V like the plots and the workbook.  Voltage_Cell
+and Current_Density are the measured columns, and the Tafel fit uses the
+same inputs as tafel_batch, so both stores agree for any cell count.  The
+cost of an analysis does not grow with the log beyond one vectorized pass:
+the Tafel search runs on at most MAX_REGION_POINTS groups of points, and the
+polarization model is fitted to the per-Power_Level means of Current_Density
+and Voltage_Cell (one steady-state point per setpoint).  The model is only
+fitted with more Power_Level bins than parameters, and R_ohm is stored only
+when the fit converged and identified it.
+
+Runs are identified by the SHA-256 of their input file, so re-ingesting a
+directory only analyses new or changed files.  The runs table is indexed by
+stack, date, temperature and pressure, and the binned table is clustered on
+(metric, power_level), so questions such as "η_cell at 80 % power for every
+run in Q3" are answered from the index without reopening any workbook.
+
+Usage:
+    python src/src/results_store.py ingest data/raw
+    python src/src/results_store.py ingest runs_manifest.csv        # path, stack, date, ... columns
+    python src/src/results_store.py query Cell_Efficiency 80 --start 2025-07-01 --end 2025-09-30
+"""
+
+
+import argparse
+import json
+import sqlite3
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import efficiency
+from ingestion import REPO_ROOT, file_sha256, load_columns
+from parallel import map_processes
+from polarization import PARAMETERS, fit_polarization
+from streaming import BinnedMeans
+from tafel_batch import discover_runs, tafel_points
+from tafel_region import find_tafel_region
+
+DEFAULT_STORE = REPO_ROOT / 'results' / 'runs.sqlite'
+
+# Bump when analyze_run() changes its results; stored runs of older versions are re-analysed
+ANALYSIS_VERSION = 3
+
+# Raw signals compute_efficiencies() derives the efficiencies from
+ANALYSIS_COLUMNS = ['Power_Level', 'Voltage', 'Current', 'Surface_Area', 'Hydrogen_Mol_Flow', 'Temperature',
+                    'Pressure']
+
+EFFICIENCY_METRICS = ['Voltage_Efficiency', 'Faraday_Efficiency', 'Cell_Efficiency', 'Overall_Efficiency']
+# Binned from the measured columns, which do not assume a cell count
+MEASURED_METRICS = ['Voltage_Cell', 'Current_Density']
+BINNED_METRICS = EFFICIENCY_METRICS + MEASURED_METRICS
+
+# Manifest columns stored as indexed run columns; any other column goes to `metadata` (JSON)
+RUN_KEYS = ['stack', 'date', 'temperature', 'pressure']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    stack TEXT,
+    run_date TEXT,
+    temperature REAL,
+    pressure REAL,
+    rows INTEGER,
+    bin_width REAL,
+    tafel_slope REAL,
+    tafel_slope_low REAL,
+    tafel_slope_high REAL,
+    j0 REAL,
+    j0_low REAL,
+    j0_high REAL,
+    tafel_r_squared REAL,
+    ohmic_resistance REAL,
+    metadata TEXT,
+    error TEXT,
+    ingested_at TEXT NOT NULL,
+    analysis_version INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_stack_date ON runs (stack, run_date);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (run_date);
+CREATE INDEX IF NOT EXISTS runs_temperature ON runs (temperature);
+CREATE INDEX IF NOT EXISTS runs_pressure ON runs (pressure);
+
+CREATE TABLE IF NOT EXISTS binned_metrics (
+    metric TEXT NOT NULL,
+    power_level REAL NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    mean REAL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (metric, power_level, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS binned_run ON binned_metrics (run_id);
+"""
+
+RUN_COLUMNS = ['sha256', 'path', 'stack', 'run_date', 'temperature', 'pressure', 'rows', 'bin_width',
+               'tafel_slope', 'tafel_slope_low', 'tafel_slope_high', 'j0', 'j0_low', 'j0_high',
+               'tafel_r_squared', 'ohmic_resistance', 'metadata', 'error', 'ingested_at', 'analysis_version']
+
+
+def connect(path=DEFAULT_STORE):
+    """Open (and create if needed) the results store."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.executescript(SCHEMA)
+    # Stores created before analysis_version existed: their runs count as version 1
+    if 'analysis_version' not in {row[1] for row in conn.execute('PRAGMA table_info(runs)')}:
+        with conn:
+            conn.execute('ALTER TABLE runs ADD COLUMN analysis_version INTEGER')
+    return conn
+
+
+def _iso_date(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return pd.Timestamp(value).date().isoformat()
+
+
+def _finite_or_none(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def analyze_run(path, sha256, metadata=None, bin_width=1.0, e_rev=efficiency.E0):
+    """
+    Reduce one run to (run row, binned rows); an exception ends up in the run's `error` column.
+
+    `metadata` may set stack, date, temperature and pressure; temperature and
+    pressure default to the run means, the date to the file's modification date.
+    `e_rev` is passed to efficiency.compute_efficiencies (None: temperature-
+    and pressure-corrected).
+    """
+    metadata = dict(metadata or {})
+    run = {'sha256': sha256, 'path': str(path), 'bin_width': bin_width, 'analysis_version': ANALYSIS_VERSION}
+    run['stack'] = metadata.pop('stack', None)
+    run['run_date'] = _iso_date(metadata.pop('date', None)) or \
+        date.fromtimestamp(Path(path).stat().st_mtime).isoformat()
+    temperature = metadata.pop('temperature', None)
+    pressure = metadata.pop('pressure', None)
+    run['metadata'] = json.dumps(metadata, default=str) if metadata else None
+    binned = []
+    try:
+        data = load_columns(path, ANALYSIS_COLUMNS, dropna=True)
+        run['rows'] = int(len(data['Power_Level']))
+        run['temperature'] = _finite_or_none(np.nanmean(data['Temperature']) if temperature is None else temperature)
+        run['pressure'] = _finite_or_none(np.nanmean(data['Pressure']) if pressure is None else pressure)
+
+        efficiencies = BinnedMeans(EFFICIENCY_METRICS, bin_width)
+        efficiencies.update(data['Power_Level'], efficiency.compute_efficiencies(data, e_rev=e_rev))
+        measured = load_columns(path, ['Power_Level'] + MEASURED_METRICS, dropna=True)
+        bins = BinnedMeans(MEASURED_METRICS, bin_width)
+        bins.update(measured['Power_Level'], measured)
+        for source in (efficiencies, bins):
+            for metric in source.names:
+                levels, means, counts = source.means(metric)
+                binned.extend((metric, float(p), float(m), int(c)) for p, m, c in zip(levels, means, counts))
+
+        # Same inputs as the tafel_batch summaries
+        fit = find_tafel_region(*tafel_points(path))
+        if fit is not None:
+            run.update({
+                'tafel_slope': fit.slope, 'tafel_slope_low': fit.slope_ci[0], 'tafel_slope_high': fit.slope_ci[1],
+                'j0': fit.j0, 'j0_low': fit.j0_ci[0], 'j0_high': fit.j0_ci[1], 'tafel_r_squared': fit.r_squared,
+            })
+        # Polarization curve through the steady-state mean of every Power_Level bin
+        levels, mean_j, _ = bins.means('Current_Density')
+        voltage_levels, mean_v, _ = bins.means('Voltage_Cell')
+        _, j_rows, v_rows = np.intersect1d(levels, voltage_levels, return_indices=True)
+        if j_rows.size > PARAMETERS:
+            model = fit_polarization(mean_j[j_rows], mean_v[v_rows])
+            if model.converged and model.r_ohm_identified:
+                run['ohmic_resistance'] = _finite_or_none(model.r_ohm)
+    except Exception as exc:
+        run['error'] = f'{type(exc).__name__}: {exc}'
+    return run, binned
+
+
+def add_run(conn, run, binned):
+    """Insert one analysed run (replacing previous ones with the same hash or path); returns its run_id."""
+    run = dict(run, ingested_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+    with conn:
+        # A changed file replaces the analysis of its previous content
+        conn.execute('DELETE FROM runs WHERE sha256 = ? OR path = ?', (run['sha256'], run['path']))
+        cursor = conn.execute(
+            f'INSERT INTO runs ({", ".join(RUN_COLUMNS)}) VALUES ({", ".join("?" * len(RUN_COLUMNS))})',
+            [run.get(name) for name in RUN_COLUMNS])
+        run_id = cursor.lastrowid
+        conn.executemany('INSERT INTO binned_metrics (metric, power_level, run_id, mean, count) VALUES (?, ?, ?, ?, ?)',
+                         [(metric, level, run_id, mean, count) for metric, level, mean, count in binned])
+    return run_id
+
+
+def ingest(source, store=DEFAULT_STORE, bin_width=1.0, processes=None, force=False):
+    """
+    Analyse every run under `source` (directory or manifest CSV) into the store.
+
+    Runs whose file hash is already stored without error by the current
+    ANALYSIS_VERSION are skipped unless `force` is set.  Returns the number
+    of runs analysed.
+    """
+    runs = discover_runs(source)
+    runs.columns = [c.lower() if c.lower() in RUN_KEYS else c for c in runs.columns]
+    conn = connect(store)
+    try:
+        done = set() if force else {row[0] for row in conn.execute(
+            'SELECT sha256 FROM runs WHERE error IS NULL AND analysis_version = ?', (ANALYSIS_VERSION,))}
+        todo = []
+        for record in runs.to_dict('records'):
+            path = record.pop('path')
+            sha256 = file_sha256(path)
+            if sha256 not in done:
+                metadata = {k: v for k, v in record.items() if not (isinstance(v, float) and np.isnan(v))}
+                todo.append((path, sha256, metadata, bin_width))
+
+        for run, binned in map_processes(analyze_run, todo, processes):
+            add_run(conn, run, binned)
+    finally:
+        conn.close()
+    print(f'{len(todo)} run(s) analysed, {len(runs) - len(todo)} unchanged run(s) skipped -> {store}')
+    return len(todo)
+
+
+def _run_filters(start=None, end=None, stack=None, temperature=None, pressure=None):
+    # temperature / pressure are (low, high) ranges; either bound may be None
+    clauses, params = [], []
+    if start is not None:
+        clauses.append('r.run_date >= ?')
+        params.append(_iso_date(start))
+    if end is not None:
+        clauses.append('r.run_date <= ?')
+        params.append(_iso_date(end))
+    if stack is not None:
+        clauses.append('r.stack = ?')
+        params.append(str(stack))
+    for column, bounds in (('temperature', temperature), ('pressure', pressure)):
+        if bounds is None:
+            continue
+        low, high = bounds
+        if low is not None:
+            clauses.append(f'r.{column} >= ?')
+            params.append(low)
+        if high is not None:
+            clauses.append(f'r.{column} <= ?')
+            params.append(high)
+    return clauses, params
+
+
+def query_runs(conn, start=None, end=None, stack=None, temperature=None, pressure=None):
+    """Run-level metrics (Tafel slope, j0, ohmic resistance, ...) of the matching runs, ordered by date."""
+    clauses, params = _run_filters(start, end, stack, temperature, pressure)
+    where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+    return pd.read_sql_query(f'SELECT r.* FROM runs r {where} ORDER BY r.run_date, r.run_id', conn, params=params)
+
+
+def query_metric(conn, metric, power_level, tolerance=0.5, start=None, end=None, stack=None,
+                 temperature=None, pressure=None):
+    """
+    Binned `metric` near `power_level` (within ±`tolerance`) for every matching run.
+
+    Bins inside the tolerance are combined with their sample counts as
+    weights.  Returns one row per run, ordered by date.
+    """
+    clauses, params = _run_filters(start, end, stack, temperature, pressure)
+    clauses = ['b.metric = ?', 'b.power_level BETWEEN ? AND ?'] + clauses
+    params = [metric, power_level - tolerance, power_level + tolerance] + params
+    sql = f"""
+        SELECT r.run_id, r.run_date, r.stack, r.temperature, r.pressure, r.path,
+               SUM(b.mean * b.count) / SUM(b.count) AS value, SUM(b.count) AS count
+        FROM binned_metrics b JOIN runs r ON r.run_id = b.run_id
+        WHERE {" AND ".join(clauses)}
+        GROUP BY r.run_id
+        ORDER BY r.run_date, r.run_id
+    """
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-run results store.')
+    parser.add_argument('--store', default=str(DEFAULT_STORE), help='SQLite file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = commands.add_parser('ingest', help='Analyse runs into the store')
+    ingest_parser.add_argument('source', help='Directory of .xlsx/.csv runs or a manifest CSV with a "path" column')
+    ingest_parser.add_argument('--bin-width', type=float, default=1.0, help='Power_Level bin width (%%)')
+    ingest_parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all CPUs)')
+    ingest_parser.add_argument('--force', action='store_true', help='Re-analyse runs even if their input is unchanged')
+
+    query_parser = commands.add_parser('query', help='Binned metric at one Power_Level across runs')
+    query_parser.add_argument('metric', choices=BINNED_METRICS)
+    query_parser.add_argument('power_level', type=float)
+    query_parser.add_argument('--tolerance', type=float, default=0.5, help='Power_Level tolerance (%%)')
+    query_parser.add_argument('--start', default=None, help='First run date (YYYY-MM-DD)')
+    query_parser.add_argument('--end', default=None, help='Last run date (YYYY-MM-DD)')
+    query_parser.add_argument('--stack', default=None)
+
+    runs_parser = commands.add_parser('runs', help='Run-level metrics (Tafel slope, j0, ohmic resistance)')
+    runs_parser.add_argument('--start', default=None)
+    runs_parser.add_argument('--end', default=None)
+    runs_parser.add_argument('--stack', default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == 'ingest':
+        ingest(args.source, args.store, args.bin_width, args.processes, args.force)
+        return
+    conn = connect(args.store)
+    try:
+        if args.command == 'query':
+            result = query_metric(conn, args.metric, args.power_level, args.tolerance, args.start, args.end, args.stack)
+        else:
+            result = query_runs(conn, args.start, args.end, args.stack)
+    finally:
+        conn.close()
+    print(result.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+slider.py
+---------
+Fast interactive efficiency explorer for combinedplotswithslider.py.
+
+EfficiencyLookup evaluates every smoothed efficiency curve once on a dense
+Power_Level grid; a slider position is then answered with a single index
+into that table instead of evaluating the polynomials.
+
+EfficiencyView draws the raw points and smoothed curves once on a persistent
+figure.  Slider moves only update the marker and text artists, which are
+redrawn with blitting (restore the cached background, draw the few animated
+artists, blit), so each step costs milliseconds and continuous_update=True
+stays responsive.  Canvases without blitting support fall back to draw_idle.
+Raw points are drawn through lod.plot_points(), so the static layer stays
+light for high-rate logs.
+"""
+
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from instrumentation import traced
+from lod import DENSITY_THRESHOLD, LOD_MAX_POINTS, plot_points
+
+
+class EfficiencyLookup:
+    """Dense table of several curves over an evenly spaced Power_Level grid."""
+
+    def __init__(self, power_min, power_max, curves, n_points=4001):
+        self.names = list(curves)
+        self.grid = np.linspace(power_min, power_max, n_points)
+        self.step = self.grid[1] - self.grid[0] if n_points > 1 else 1.0
+        self.table = np.vstack([np.asarray(curves[name](self.grid), dtype=float) for name in self.names])
+
+    def index(self, power):
+        i = int(round((power - self.grid[0]) / self.step))
+        return min(max(i, 0), len(self.grid) - 1)
+
+    def values(self, power):
+        """Return {name: value} at the grid point nearest to `power`."""
+        column = self.table[:, self.index(power)]
+        return dict(zip(self.names, column))
+
+
+class EfficiencyView:
+    """
+    Persistent figure with blitted markers for the selected Power_Level.
+
+    `series` maps each curve name in `lookup` to (raw y values, label, color);
+    `power_level` holds the raw x values.  Raw series longer than `max_points`
+    are decimated, longer than `density_threshold` drawn as density rasters.
+    """
+
+    def __init__(self, lookup, power_level, series, figsize=(10, 6), max_points=LOD_MAX_POINTS,
+                 density_threshold=DENSITY_THRESHOLD):
+        self.lookup = lookup
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        ax = self.ax
+
+        # Static content: drawn once, then captured as the blitting background
+        for name, (raw, label, color) in series.items():
+            plot_points(ax, power_level, raw, color, markersize=4, alpha=0.7, max_points=max_points,
+                        density_threshold=density_threshold)
+            ax.plot(lookup.grid, lookup.table[lookup.names.index(name)], '-', label=label, color=color)
+        ax.set_title('Smoothed Efficiency Metrics vs Power Level (%)')
+        ax.set_xlabel('Power Level (%)')
+        ax.set_ylabel('Efficiency')
+        ax.legend()
+        ax.grid()
+        self.fig.tight_layout()
+
+        # Dynamic content: only these artists change when the slider moves
+        self.markers = {}
+        self.labels = {}
+        for name, (raw, label, color) in series.items():
+            self.markers[name], = ax.plot([], [], 'o', color=color, zorder=5, animated=True)
+            self.labels[name] = ax.text(0, 0, '', color=color, verticalalignment='bottom', animated=True)
+        self.short_names = {name: label.split()[0] for name, (raw, label, color) in series.items()}
+
+        self.background = None
+        self.power = lookup.grid[0]
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # Full redraws (resize, zoom, first show) invalidate the cached background
+        canvas = self.fig.canvas
+        if getattr(canvas, 'supports_blit', False):
+            self.background = canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_dynamic()
+
+    def _draw_dynamic(self):
+        for artist in (*self.markers.values(), *self.labels.values()):
+            self.ax.draw_artist(artist)
+
+    @traced('slider_update')
+    def update(self, power):
+        """Move the markers and labels to `power` and redraw only those artists."""
+        self.power = power
+        for name, value in self.lookup.values(power).items():
+            self.markers[name].set_data([power], [value])
+            self.labels[name].set_position((power, value))
+            self.labels[name].set_text(f'  {self.short_names[name]}: {value:.2f}')
+
+        canvas = self.fig.canvas
+        if self.background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self._draw_dynamic()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
@@ -0,0 +1,216 @@
+"""
+streaming.py
+------------
+Chunked metric computation for electrolyzer logs that do not fit in memory.
+
+The log is walked in fixed-size blocks from the columnar cache (see
+ingestion.py).  For every block the per-row quantities are derived
+
+-Overpotential (mV)
+-Voltage efficiency
+-Faraday efficiency
+-Cell efficiency
+
+and folded into running aggregates: min/max/mean/std per quantity, binned
+means per Power_Level and the sufficient statistics of the Tafel regression
+(overpotential vs log10 of current density).  Only the aggregates are kept
+between blocks, so memory stays bounded by the chunk size.
+
+compute_metrics() runs the same aggregation over in-memory arrays, so both
+paths produce the same numbers.
+"""
+
+
+import numpy as np
+
+import efficiency
+from ingestion import CSV_CHUNK_ROWS, iter_chunks
+from instrumentation import traced
+
+# Columns read from the log by the streaming pipeline
+STREAM_COLUMNS = ['Power_Level', 'Voltage_Cell', 'Current_Density', 'Current_Cell', 'Hydrogen_Mol_Flow']
+
+# Fixed Tafel region in log10(Current Density).  tafelequation.py, tafel_batch.py
+# and results_store.py search the linear region (tafel_region.py), which needs
+# the whole sorted curve; the streaming and online regressions deliberately keep
+# a fixed window so they stay single-pass, O(1) per sample
+TAFEL_WINDOW = (2, 2.3)
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream, ignoring NaN and infinite values."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        # One division by a zero reading (idle sample) must not poison the running moments
+        values = values[np.isfinite(values)]
+        n = values.size
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = np.square(values - mean).sum()
+        # Chan et al. parallel update keeps the variance stable across chunks
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    def as_dict(self):
+        return {'count': self.count, 'mean': self.mean if self.count else np.nan, 'std': self.std,
+                'min': self.min if self.count else np.nan, 'max': self.max if self.count else np.nan}
+
+
+class BinnedMeans:
+    """Running means of several quantities, binned by Power_Level (non-finite values are skipped)."""
+
+    def __init__(self, names, bin_width=1.0):
+        self.names = list(names)
+        self.bin_width = bin_width
+        self.counts = {name: {} for name in self.names}
+        self.sums = {name: {} for name in self.names}
+
+    def update(self, power_level, values):
+        keys = np.round(np.asarray(power_level, dtype=float) / self.bin_width)
+        for name in self.names:
+            column = np.asarray(values[name], dtype=float)
+            valid = np.isfinite(keys) & np.isfinite(column)
+            if not valid.any():
+                continue
+            bins, inverse = np.unique(keys[valid], return_inverse=True)
+            sums = np.bincount(inverse, weights=column[valid])
+            counts = np.bincount(inverse)
+            for key, s, c in zip(bins * self.bin_width, sums, counts):
+                key = float(key)
+                self.sums[name][key] = self.sums[name].get(key, 0.0) + s
+                self.counts[name][key] = self.counts[name].get(key, 0) + int(c)
+
+    def means(self, name):
+        """Return (bin centres, mean values, counts) for one quantity, sorted by bin."""
+        keys = sorted(self.counts[name])
+        counts = np.array([self.counts[name][k] for k in keys], dtype=int)
+        sums = np.array([self.sums[name][k] for k in keys], dtype=float)
+        return np.array(keys, dtype=float), sums / np.maximum(counts, 1), counts
+
+
+class RegressionSums:
+    """Sufficient statistics of a simple linear regression y = slope * x + intercept."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0  # Sums of co-deviations about the running means
+        self.sxy = 0.0
+        self.syy = 0.0
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        n = x.size
+        if n == 0:
+            return
+        mx, my = x.mean(), y.mean()
+        dx, dy = x - mx, y - my
+        sxx, sxy, syy = dx @ dx, dx @ dy, dy @ dy
+        total = self.n + n
+        ex, ey = mx - self.mean_x, my - self.mean_y
+        weight = self.n * n / total
+        self.sxx += sxx + ex * ex * weight
+        self.sxy += sxy + ex * ey * weight
+        self.syy += syy + ey * ey * weight
+        self.mean_x += ex * n / total
+        self.mean_y += ey * n / total
+        self.n = total
+
+    def result(self):
+        """Return slope, intercept, r_value and slope std_err (like scipy.stats.linregress)."""
+        if self.n < 2 or self.sxx == 0:
+            return {'n': self.n, 'slope': np.nan, 'intercept': np.nan, 'r_value': np.nan, 'std_err': np.nan}
+        slope = self.sxy / self.sxx
+        intercept = self.mean_y - slope * self.mean_x
+        r_value = self.sxy / np.sqrt(self.sxx * self.syy) if self.syy > 0 else 0.0
+        if self.n > 2:
+            residual = max(self.syy - slope * self.sxy, 0.0)
+            std_err = np.sqrt(residual / (self.n - 2) / self.sxx)
+        else:
+            std_err = np.nan
+        return {'n': self.n, 'slope': slope, 'intercept': intercept, 'r_value': r_value, 'std_err': std_err}
+
+
+class MetricAccumulator:
+    """Fold blocks of raw columns into all streaming aggregates."""
+
+    QUANTITIES = ['Overpotential', 'Voltage_Efficiency', 'Faraday_Efficiency', 'Cell_Efficiency']
+
+    def __init__(self, bin_width=1.0, tafel_window=TAFEL_WINDOW, e0=efficiency.E0):
+        self.e0 = e0
+        self.tafel_window = tafel_window
+        self.stats = {name: RunningStats() for name in self.QUANTITIES}
+        self.binned = BinnedMeans(self.QUANTITIES, bin_width)
+        self.tafel = RegressionSums()
+        self.rows = 0
+
+    def update(self, chunk):
+        voltage_cell = np.asarray(chunk['Voltage_Cell'])
+        current_density = np.asarray(chunk['Current_Density'])
+        eta_v = efficiency.voltage_efficiency(voltage_cell, self.e0)
+        eta_f = efficiency.faraday_efficiency(chunk['Hydrogen_Mol_Flow'], chunk['Current_Cell'])
+        derived = {
+            'Overpotential': efficiency.overpotential(voltage_cell, self.e0),
+            'Voltage_Efficiency': eta_v,
+            'Faraday_Efficiency': eta_f,
+            'Cell_Efficiency': efficiency.cell_efficiency(eta_v, eta_f),
+        }
+        for name, values in derived.items():
+            self.stats[name].update(values)
+        self.binned.update(chunk['Power_Level'], derived)
+
+        # Tafel regression over the linear region of overpotential vs log10(j)
+        positive = (current_density > 0) & ~np.isnan(voltage_cell)
+        log_j = np.log10(current_density[positive])
+        low, high = self.tafel_window
+        region = (log_j > low) & (log_j < high)
+        self.tafel.update(log_j[region], derived['Overpotential'][positive][region])
+        self.rows += len(voltage_cell)
+
+    def result(self):
+        binned = {}
+        for name in self.QUANTITIES:
+            levels, means, counts = self.binned.means(name)
+            binned[name] = {'power_level': levels, 'mean': means, 'count': counts}
+        return {
+            'rows': self.rows,
+            'stats': {name: s.as_dict() for name, s in self.stats.items()},
+            'binned': binned,
+            'tafel': self.tafel.result(),
+        }
+
+
+def compute_metrics(data, bin_width=1.0, tafel_window=TAFEL_WINDOW):
+    """Aggregate metrics over in-memory arrays (a dict of STREAM_COLUMNS)."""
+    accumulator = MetricAccumulator(bin_width, tafel_window)
+    accumulator.update(data)
+    return accumulator.result()
+
+
+@traced('stream_metrics')
+def stream_metrics(path, chunk_rows=CSV_CHUNK_ROWS, bin_width=1.0, tafel_window=TAFEL_WINDOW):
+    """Aggregate metrics over a log of any size, reading it in blocks of `chunk_rows`."""
+    accumulator = MetricAccumulator(bin_width, tafel_window)
+    for chunk in iter_chunks(path, STREAM_COLUMNS, chunk_rows):
+        accumulator.update(chunk)
+    return accumulator.result()
@@ -0,0 +1,182 @@
+"""
+tafel_batch.py
+--------------
+Batch Tafel analysis over many polarization sweeps.
+
+Takes a directory of workbooks/CSV logs (or a manifest CSV with a `path`
+column plus any metadata columns such as stack or temperature), fits the
+Tafel slope, exchange current density j0 and R² of every run in parallel
+worker processes, and writes one summary table (.csv or .parquet).
+
+Runs are identified by the SHA-256 of their input file; when the summary
+already holds a row with the same hash and fit settings, the run is skipped
+and the previous result is reused.  Plots are optional and always rendered
+headlessly; a skipped run is still fitted again when its requested plot does
+not exist yet.
+
+Usage:
+    python src/src/tafel_batch.py data/raw --summary results/tafel_summary.csv --plots results/plots/tafel
+"""
+
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import efficiency
+from ingestion import REPO_ROOT, file_sha256, load_columns
+from parallel import map_processes
+from tafel_region import find_tafel_region
+
+INPUT_SUFFIXES = ('.xlsx', '.xlsm', '.xls', '.csv')
+DEFAULT_SUMMARY = REPO_ROOT / 'results' / 'tafel_summary.csv'
+
+
+def tafel_points(path, e0=efficiency.E0):
+    """Return (log10 j, η in mV) of one run, keeping rows with a positive current density."""
+    data = load_columns(path, ['Voltage_Cell', 'Current_Density'], dropna=True)
+    current_density = data['Current_Density']
+    positive = current_density > 0
+    return np.log10(current_density[positive]), efficiency.overpotential(data['Voltage_Cell'][positive], e0)
+
+
+def plot_tafel(log_j, eta, fit, out_path):
+    """Headless Tafel plot of one run (data points and fitted line)."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.scatter(log_j, eta, color='blue', s=15)
+    if fit is not None:
+        x = np.linspace(*fit.log_j_range, 100)
+        ax.plot(x, fit.intercept + fit.slope * x, color='red',
+                label=f'Linear Fit (Tafel Slope = {fit.slope:.3f} mV/decade)')
+        ax.legend(loc='upper left', fontsize=10)
+    ax.set_xlabel('log(Current Density) [log(A/cm²)]')
+    ax.set_ylabel('Overpotential η (mV)')
+    ax.set_title(Path(out_path).stem)
+    ax.grid(True)
+    fig.savefig(out_path)
+    fig.clear()
+
+
+def plot_path(plot_dir, path, sha256):
+    return Path(plot_dir) / f'{Path(path).stem}_{sha256[:8]}_Tafel.png'
+
+
+def analyze_run(path, sha256, plot_dir=None, min_points=5):
+    """Fit one run; returns a summary row (dict). Errors are reported in the row, not raised."""
+    row = {'path': str(path), 'sha256': sha256, 'min_points': min_points}
+    try:
+        log_j, eta = tafel_points(path)
+        fit = find_tafel_region(log_j, eta, min_points=min_points)
+        row['points'] = int(log_j.size)
+        if fit is None:
+            row['error'] = 'no linear Tafel region found'
+        else:
+            row.update({
+                'tafel_slope': fit.slope,
+                'tafel_slope_low': fit.slope_ci[0],
+                'tafel_slope_high': fit.slope_ci[1],
+                'intercept': fit.intercept,
+                'j0': fit.j0,
+                'j0_low': fit.j0_ci[0],
+                'j0_high': fit.j0_ci[1],
+                'r_squared': fit.r_squared,
+                'region_points': fit.n,
+                'log_j_low': fit.log_j_range[0],
+                'log_j_high': fit.log_j_range[1],
+            })
+        if plot_dir is not None:
+            Path(plot_dir).mkdir(parents=True, exist_ok=True)
+            plot_tafel(log_j, eta, fit, plot_path(plot_dir, path, sha256))
+    except Exception as exc:
+        row['error'] = f'{type(exc).__name__}: {exc}'
+    return row
+
+
+def discover_runs(source):
+    """
+    Return a DataFrame with one row per run and at least a `path` column.
+
+    `source` is a directory (searched recursively for workbooks/CSV logs) or
+    a manifest CSV whose `path` column is resolved relative to the manifest.
+    """
+    source = Path(source)
+    if source.is_dir():
+        paths = sorted(p for p in source.rglob('*')
+                       if p.suffix.lower() in INPUT_SUFFIXES and not p.name.startswith('~$'))
+        return pd.DataFrame({'path': [str(p) for p in paths]})
+    manifest = pd.read_csv(source)
+    if 'path' not in manifest.columns:
+        raise ValueError(f'Manifest {source} has no "path" column')
+    manifest['path'] = [str((source.parent / p).resolve()) for p in manifest['path']]
+    return manifest
+
+
+def read_summary(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path) if path.suffix == '.parquet' else pd.read_csv(path)
+
+
+def write_summary(summary, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.parquet':
+        summary.to_parquet(path, index=False)
+    else:
+        summary.to_csv(path, index=False)
+
+
+def run_batch(source, summary_path=DEFAULT_SUMMARY, plot_dir=None, processes=None, force=False, min_points=5):
+    """Fit every run under `source`, skip unchanged ones, and write the summary table."""
+    runs = discover_runs(source)
+    runs['sha256'] = [file_sha256(p) for p in runs['path']]
+
+    previous = None if force else read_summary(summary_path)
+    done = {}
+    if previous is not None and 'sha256' in previous.columns:
+        ok = previous[previous['error'].isna()] if 'error' in previous.columns else previous
+        done = {row['sha256']: row for row in ok.to_dict('records') if row.get('min_points') == min_points}
+
+    def unchanged(path, sha256):
+        # A cached fit is reused only when the requested plot exists as well
+        return sha256 in done and (plot_dir is None or plot_path(plot_dir, path, sha256).exists())
+
+    metadata = [c for c in runs.columns if c not in ('path', 'sha256')]
+    todo = [(p, h, plot_dir, min_points) for p, h in zip(runs['path'], runs['sha256']) if not unchanged(p, h)]
+
+    results = {row['sha256']: row for row in map_processes(analyze_run, todo, processes)}
+
+    rows = []
+    for record in runs.to_dict('records'):
+        row = dict(results.get(record['sha256']) or done[record['sha256']])
+        row['path'] = record['path']
+        row.update({name: record[name] for name in metadata})
+        rows.append(row)
+    summary = pd.DataFrame(rows)
+    write_summary(summary, summary_path)
+    print(f'{len(todo)} run(s) fitted, {len(runs) - len(todo)} unchanged run(s) skipped -> {summary_path}')
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch Tafel fitting over many polarization sweeps.')
+    parser.add_argument('source', help='Directory of .xlsx/.csv runs or a manifest CSV with a "path" column')
+    parser.add_argument('--summary', default=str(DEFAULT_SUMMARY), help='Output table (.csv or .parquet)')
+    parser.add_argument('--plots', default=None, help='Directory for headless Tafel plots (omit to skip plots)')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all CPUs)')
+    parser.add_argument('--min-points', type=int, default=5, help='Minimum points in the Tafel region')
+    parser.add_argument('--force', action='store_true', help='Refit runs even if their input is unchanged')
+    args = parser.parse_args(argv)
+    run_batch(args.source, args.summary, args.plots, args.processes, args.force, args.min_points)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+tafel_region.py
+---------------
+Automatic detection of the linear Tafel region of a polarization curve.
+
+Instead of hand-tuning a fixed log10(j) window, every contiguous window of
+the sorted (log10 j, η) points is scored.  Window sums of x, y, x², xy and
+y² come from prefix sums, so the regression statistics of all O(n²)
+candidate windows are evaluated as array operations (in blocks of start
+indices to bound memory) without calling linregress in a loop.
+
+A window scores R² minus a penalty on the relative standard error of its
+slope, which favours long, straight, stable segments over short lucky ones.
+The search is quadratic in the number of points, so longer curves are first
+reduced to at most MAX_REGION_POINTS groups of consecutive points (mean
+log10 j and η per group); window edges are searched on the groups and the
+final line is fitted to the raw points of the chosen groups.  The best
+window is returned with its slope, intercept, exchange current
+density j0 and confidence intervals.  bootstrap_region() adds residual
+bootstrap intervals for the same window; slope and intercept are linear in
+η, so all resamples reduce to one matrix product per block.
+"""
+
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.stats import t as student_t
+
+from fitting import BOOTSTRAP_BLOCK, BOOTSTRAP_ROWS
+from instrumentation import traced
+
+TafelFit = namedtuple('TafelFit', [
+    'slope', 'intercept', 'r_squared', 'j0', 'slope_ci', 'intercept_ci', 'j0_ci',
+    'slope_stderr', 'intercept_stderr', 'n', 'start', 'stop', 'log_j_range'
+])
+
+TafelBootstrap = namedtuple('TafelBootstrap', [
+    'slope_ci', 'intercept_ci', 'j0_ci', 'slope_std', 'intercept_std', 'n_resamples', 'grid', 'low', 'high'
+])
+
+BLOCK_WINDOWS = 500_000  # Candidate windows scored per vectorized block (bounds worker memory)
+MAX_REGION_POINTS = 2_000  # Points (or groups of points) entering the O(n²) window search
+
+
+def _window_scores(x, y, min_points, stability_weight, min_span):
+    """Score every window [i, k) with k - i >= min_points; returns (score, i, k) of the best."""
+    n = x.size
+    zero = np.zeros(1)
+    sx = np.concatenate([zero, np.cumsum(x)])
+    sy = np.concatenate([zero, np.cumsum(y)])
+    sxx = np.concatenate([zero, np.cumsum(x * x)])
+    sxy = np.concatenate([zero, np.cumsum(x * y)])
+    syy = np.concatenate([zero, np.cumsum(y * y)])
+
+    best = (-np.inf, -1, -1)
+    ends = np.arange(n + 1)
+    rows = max(1, BLOCK_WINDOWS // max(n, 1))
+    for first in range(0, n - min_points + 1, rows):
+        starts = np.arange(first, min(first + rows, n - min_points + 1))[:, None]
+        stops = ends[None, :]
+        count = (stops - starts).astype(float)
+        valid = count >= min_points
+        count = np.where(valid, count, np.nan)
+
+        wx = sx[stops] - sx[starts]
+        wy = sy[stops] - sy[starts]
+        cxx = sxx[stops] - sxx[starts] - wx * wx / count
+        cxy = sxy[stops] - sxy[starts] - wx * wy / count
+        cyy = syy[stops] - syy[starts] - wy * wy / count
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = cxy / cxx
+            r_squared = cxy * cxy / (cxx * cyy)
+            residual = np.maximum(cyy - slope * cxy, 0.0)
+            rel_stderr = np.sqrt(residual / (count - 2) / cxx) / np.abs(slope)
+            score = r_squared - stability_weight * rel_stderr
+
+        span = x[np.minimum(stops, n) - 1] - x[starts]
+        score[~valid | ~(slope > 0) | ~(cxx > 0) | (span < min_span) | ~np.isfinite(score)] = -np.inf
+        flat = np.argmax(score)
+        i, k = np.unravel_index(flat, score.shape)
+        if score[i, k] > best[0]:
+            best = (score[i, k], int(starts[i, 0]), int(k))
+    return best
+
+
+def fit_window(log_j, eta, confidence=0.95):
+    """Least-squares Tafel line over given points, with confidence intervals."""
+    x = np.asarray(log_j, dtype=float)
+    y = np.asarray(eta, dtype=float)
+    n = x.size
+    mean_x, mean_y = x.mean(), y.mean()
+    dx, dy = x - mean_x, y - mean_y
+    cxx, cxy, cyy = dx @ dx, dx @ dy, dy @ dy
+    slope = cxy / cxx
+    intercept = mean_y - slope * mean_x
+    r_squared = cxy * cxy / (cxx * cyy) if cyy > 0 else 1.0
+
+    dof = n - 2
+    s2 = max(cyy - slope * cxy, 0.0) / dof if dof > 0 else np.nan
+    slope_stderr = np.sqrt(s2 / cxx)
+    intercept_stderr = np.sqrt(s2 * (1 / n + mean_x * mean_x / cxx))
+    tq = student_t.ppf(0.5 + confidence / 2, dof) if dof > 0 else np.nan
+
+    # log10(j0) = -intercept / slope; delta method with cov(slope, intercept) = -mean_x * var(slope)
+    log_j0 = -intercept / slope
+    var_slope = slope_stderr ** 2
+    var_log_j0 = (intercept_stderr ** 2 / slope ** 2
+                  + intercept ** 2 * var_slope / slope ** 4
+                  + 2 * intercept * mean_x * var_slope / slope ** 3)
+    half = tq * np.sqrt(max(var_log_j0, 0.0))
+
+    return TafelFit(
+        slope=slope, intercept=intercept, r_squared=r_squared, j0=10 ** log_j0,
+        slope_ci=(slope - tq * slope_stderr, slope + tq * slope_stderr),
+        intercept_ci=(intercept - tq * intercept_stderr, intercept + tq * intercept_stderr),
+        j0_ci=(10 ** (log_j0 - half), 10 ** (log_j0 + half)),
+        slope_stderr=slope_stderr, intercept_stderr=intercept_stderr, n=n,
+        start=0, stop=n, log_j_range=(x.min(), x.max()),
+    )
+
+
+def _sorted_points(log_j, eta):
+    x = np.asarray(log_j, dtype=float)
+    y = np.asarray(eta, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    order = np.argsort(x, kind='stable')
+    return x[order], y[order]
+
+
+def _group_means(x, y, max_points):
+    """Means of `max_points` groups of consecutive sorted points; returns (x, y, group edges)."""
+    edges = np.unique(np.linspace(0, x.size, max_points + 1).astype(np.int64))
+    counts = np.diff(edges)
+    return (np.add.reduceat(x, edges[:-1]) / counts, np.add.reduceat(y, edges[:-1]) / counts, edges)
+
+
+@traced('tafel_region')
+def find_tafel_region(log_j, eta, min_points=5, stability_weight=1.0, min_span=0.0, confidence=0.95,
+                      max_points=MAX_REGION_POINTS):
+    """
+    Find the best linear Tafel window of η (mV) against log10(j).
+
+    Points are sorted by log10(j) first; `start`/`stop` of the result index
+    that sorted order.  `min_span` is the minimum width of a window in
+    decades.  Above `max_points` points the window edges are searched on
+    `max_points` groups of consecutive points (None searches every point,
+    at quadratic cost).  Returns None when no window with a positive slope
+    exists.
+    """
+    x, y = _sorted_points(log_j, eta)
+    min_points = max(min_points, 3)
+    if x.size < min_points:
+        return None
+
+    edges = None
+    gx, gy = x, y
+    if max_points is not None and x.size > max_points:
+        gx, gy, edges = _group_means(x, y, max_points)
+    # Centre the data so the prefix-sum variances do not lose precision
+    score, start, stop = _window_scores(gx - gx.mean(), gy - gy.mean(), min_points, stability_weight, min_span)
+    if start < 0:
+        return None
+    if edges is not None:
+        start, stop = int(edges[start]), int(edges[stop])
+    fit = fit_window(x[start:stop], y[start:stop], confidence)
+    return fit._replace(start=start, stop=stop)
+
+
+@traced('tafel_bootstrap')
+def bootstrap_region(log_j, eta, fit, n_resamples=10_000, confidence=0.95, seed=None, grid=None):
+    """
+    Residual-bootstrap intervals for the Tafel window of `fit`.
+
+    `log_j`/`eta` are the points given to find_tafel_region().  Resampled
+    residuals (inflated by sqrt(n / (n - 2))) are added to the fitted line and
+    every resample is refitted at once.  Windows longer than BOOTSTRAP_ROWS
+    resample a fixed random subset of rows, rescaled to the full window
+    (m-out-of-n bootstrap).  With `grid` (log10 j values) the percentile band
+    of the fitted line is returned as `low`/`high`.
+    """
+    x, y = _sorted_points(log_j, eta)
+    x, y = x[fit.start:fit.stop], y[fit.start:fit.stop]
+    n = x.size
+    mean_x = x.mean()
+    dx = x - mean_x
+    cxx = dx @ dx
+    residuals = y - (fit.intercept + fit.slope * x)
+    if n > 2:
+        residuals = residuals * np.sqrt(n / (n - 2))
+
+    # Least squares is linear in η: a resample shifts slope and intercept by
+    # fixed linear functions of its resampled residuals
+    slope_weights = dx / cxx
+    mean_weights = np.full(n, 1.0 / n)
+    rng = np.random.default_rng(seed)
+    m = n
+    if n > BOOTSTRAP_ROWS:
+        m = BOOTSTRAP_ROWS
+        rows = np.sort(rng.choice(n, m, replace=False))
+        gain = np.sqrt(n / m)
+        slope_weights = gain * slope_weights[rows]
+        mean_weights = gain * mean_weights[rows]
+
+    block = max(1, BOOTSTRAP_BLOCK // m)
+    slopes, intercepts = [], []
+    for first in range(0, n_resamples, block):
+        resampled = residuals[rng.integers(0, n, size=(min(block, n_resamples - first), m))]
+        d_slope = resampled @ slope_weights
+        slopes.append(fit.slope + d_slope)
+        intercepts.append(fit.intercept + resampled @ mean_weights - d_slope * mean_x)
+    slopes = np.concatenate(slopes)
+    intercepts = np.concatenate(intercepts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        j0 = np.where(slopes > 0, 10 ** (-intercepts / slopes), np.nan)
+
+    tail = 50 * (1 - confidence)
+    bounds = [tail, 100 - tail]
+    low = high = None
+    if grid is not None:
+        grid = np.asarray(grid, dtype=float)
+        low, high = np.percentile(intercepts[:, None] + slopes[:, None] * grid, bounds, axis=0)
+    return TafelBootstrap(
+        slope_ci=tuple(np.percentile(slopes, bounds)),
+        intercept_ci=tuple(np.percentile(intercepts, bounds)),
+        j0_ci=tuple(np.nanpercentile(j0, bounds)) if np.isfinite(j0).any() else (np.nan, np.nan),
+        slope_std=slopes.std(ddof=1), intercept_std=intercepts.std(ddof=1),
+        n_resamples=n_resamples, grid=grid, low=low, high=high,
+    )
@@ -1,39 +1,23 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.stats import linregress
 from scipy.interpolate import make_interp_spline
 
+from ingestion import load_columns
+from instrumentation import stage
+from tafel_region import bootstrap_region, find_tafel_region
+
 # Load the Excel file (update the path if necessary)
 file_path = 'C:\\Users\\User\\Desktop\\Internship\\Real Results\\Book1.xlsx'
-df = pd.read_excel(file_path)
-
-# Rename columns for easier access (update if necessary)
-df.columns = [
-    'Power_Level', 'Voltage', 'Current', 'Surface_Area', 'Hydrogen_Volume_Flow',
-    'Valve_Output', 'Temperature', 'Pressure', 'Voltage_Cell', 'Current_Density', 
-    'Current_Cell', 'Real_Hydrogen_Volume_Flow_m3', 'Real_Hydrogen_Volume_Flow_kg', 
-    'Mass_Flow_kg_s', 'Hydrogen_Mol_Flow', 'Voltage_Efficiency', 'Faraday_Efficiency', 
-    'Cell_Efficiency', 'Power', 'Overall_Efficiency'
-]
-
-# Drop the first row if it contains units (adjust as needed)
-df = df.drop(0)
 
-# Ensure relevant columns are numeric (ignore errors for non-numeric cells)
-df['Voltage_Cell'] = pd.to_numeric(df['Voltage_Cell'], errors='coerce')
-df['Current_Density'] = pd.to_numeric(df['Current_Density'], errors='coerce')
-
-# Drop rows with missing values in the columns of interest
-df = df.dropna(subset=['Voltage_Cell', 'Current_Density'])
+# Load only the columns needed for the Tafel plot and drop rows with missing values
+data = load_columns(file_path, ['Voltage_Cell', 'Current_Density'], dropna=True)
 
 # Calculate overpotential (η) in millivolts (mV)
 E0 = 1.23  # Standard potential for hydrogen evolution reaction in V
-df['Overpotential'] = (df['Voltage_Cell'] - E0) * 1000  # Convert overpotential to mV (η = (E - E0) * 1000)
+overpotential = (data['Voltage_Cell'] - E0) * 1000  # Convert overpotential to mV (η = (E - E0) * 1000)
 
 # Select data for Tafel plot: Overpotential (η) vs log(Current Density)
-current_density = df['Current_Density']
-overpotential = df['Overpotential']
+current_density = data['Current_Density']
 
 # Convert current density to log scale (only positive values)
 log_current_density = np.log10(current_density[current_density > 0])
@@ -41,36 +25,48 @@ overpotential = overpotential[current_density > 0]
 
 # Interpolate blue data points for smooth curve
 log_current_density_smooth = np.linspace(log_current_density.min(), log_current_density.max(), 200)
-overpotential_smooth = make_interp_spline(log_current_density, overpotential)(log_current_density_smooth)
+with stage('interp_spline', rows=len(log_current_density)):
+    overpotential_smooth = make_interp_spline(log_current_density, overpotential)(log_current_density_smooth)
 
 # Plot the original data and interpolated blue line
 plt.figure(figsize=(8, 6))
 plt.scatter(log_current_density, overpotential, color='blue', s=15)  # Adjusted size of dots
 plt.plot(log_current_density_smooth, overpotential_smooth, color='blue', linestyle='-', label='Interpolated Data')
 
-# Define a linear region and perform linear regression for Tafel slope
-linear_region = (log_current_density > 2) & (log_current_density < 2.3)  # Adjust based on data
+# Find the linear Tafel region automatically: every contiguous window of the
+# sorted data is scored by R² and slope stability (long logs are searched on
+# at most MAX_REGION_POINTS groups of consecutive points)
+tafel_fit = find_tafel_region(log_current_density, overpotential)
 
-if log_current_density[linear_region].empty or overpotential[linear_region].empty:
-    print("Warning: No data points in the selected linear region. Adjust the range.")
+if tafel_fit is None:
+    print("Warning: No linear Tafel region with a positive slope was found.")
 else:
-    # Perform linear regression on the selected linear region
-    slope, intercept, r_value, p_value, std_err = linregress(
-        log_current_density[linear_region], overpotential[linear_region]
-    )
-    print(f'Tafel Slope: {slope:.3f} mV/decade')
+    slope, intercept = tafel_fit.slope, tafel_fit.intercept
+    region_low, region_high = tafel_fit.log_j_range
+    print(f'Tafel region: {region_low:.3f} <= log(j) <= {region_high:.3f} ({tafel_fit.n} points, R² = {tafel_fit.r_squared:.4f})')
+    print(f'Tafel Slope: {slope:.3f} mV/decade '
+          f'(95% CI {tafel_fit.slope_ci[0]:.3f} to {tafel_fit.slope_ci[1]:.3f})')
 
     # Generate smooth values for the linear fit
-    log_current_density_fit = np.linspace(log_current_density[linear_region].min(), log_current_density[linear_region].max(), 100)
+    log_current_density_fit = np.linspace(region_low, region_high, 100)
     overpotential_fit = intercept + slope * log_current_density_fit
 
     # Plot the Tafel fit line (red) on top of interpolated blue data
     plt.plot(log_current_density_fit, overpotential_fit, color='red', label=f'Linear Fit (Tafel Slope = {slope:.3f} mV/decade)')
 
+    # Residual bootstrap of the Tafel window: 10k resamples refitted in one batch
+    tafel_boot = bootstrap_region(log_current_density, overpotential, tafel_fit, grid=log_current_density_fit)
+    print(f'Bootstrap ({tafel_boot.n_resamples} resamples) 95% CI: Tafel Slope '
+          f'{tafel_boot.slope_ci[0]:.3f} to {tafel_boot.slope_ci[1]:.3f} mV/decade, '
+          f'j0 {tafel_boot.j0_ci[0]:.2f} to {tafel_boot.j0_ci[1]:.2f} A/cm²')
+    plt.fill_between(log_current_density_fit, tafel_boot.low, tafel_boot.high, color='red', alpha=0.2,
+                     linewidth=0, label='95% bootstrap band')
+
     # Calculate the x-intercept (exchange current density) and format it in decimal
-    j0 = 10 ** (-intercept / slope)  # j0 = 10^(-c/m)
+    j0 = tafel_fit.j0  # j0 = 10^(-c/m)
     j0_formatted = f"{j0:.2f}"  # Format as a decimal with two decimal places
-    print(f'Exchange Current Density (j0): {j0_formatted} A/cm²')
+    print(f'Exchange Current Density (j0): {j0_formatted} A/cm² '
+          f'(95% CI {tafel_fit.j0_ci[0]:.2f} to {tafel_fit.j0_ci[1]:.2f})')
 
     # Display the slope equation, Tafel equation, and formatted exchange current density
     slope_equation_text = f'Overpotential $\eta = ({slope:.3f}) \cdot \log(j) + ({intercept:.3f})$'
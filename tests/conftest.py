@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The analysis modules are flat scripts in src/src that import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'src'))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the columnar cache of test inputs out of data/cache."""
+    import ingestion
+    cache = tmp_path / 'cache'
+    monkeypatch.setattr(ingestion, 'DEFAULT_CACHE_DIR', cache)
+    return cache
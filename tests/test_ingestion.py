@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingestion
+from ingestion import COLUMNS, load_columns
+
+HEADER = [COLUMNS, ['%'] * len(COLUMNS)]  # Column names and a units row, as exported from the PLC
+
+
+def sample_rows(rows=50, seed=0):
+    return np.random.default_rng(seed).uniform(1.0, 100.0, (rows, len(COLUMNS))).round(6)
+
+
+def write_csv(path, rows):
+    with open(path, 'w') as fh:
+        for line in HEADER:
+            fh.write(','.join(line) + '\n')
+        for row in rows:
+            fh.write(','.join('' if np.isnan(v) else repr(float(v)) for v in row) + '\n')
+
+
+def assert_columns_equal(data, rows):
+    for index, name in enumerate(COLUMNS):
+        np.testing.assert_array_equal(data[name], rows[:, index])
+
+
+def test_header_rows_are_dropped_and_data_rows_kept(tmp_path):
+    rows = sample_rows()
+    rows[0, 0] = np.nan  # First data row without a Power_Level
+    path = tmp_path / 'run.csv'
+    write_csv(path, rows)
+    assert_columns_equal(load_columns(path), rows)
+
+
+def test_quoted_numbers_are_parsed(tmp_path):
+    rows = sample_rows(rows=20)
+    path = tmp_path / 'run.csv'
+    with open(path, 'w') as fh:
+        fh.write(','.join(COLUMNS) + '\n')
+        for row in rows:
+            fh.write(','.join(f'"{float(v)!r}"' for v in row) + '\n')
+    assert_columns_equal(load_columns(path), rows)
+
+
+def test_changed_content_rebuilds_the_cache(tmp_path):
+    path = tmp_path / 'run.csv'
+    write_csv(path, sample_rows(seed=0))
+    load_columns(path)
+    rows = sample_rows(seed=1)
+    write_csv(path, rows)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert_columns_equal(load_columns(path), rows)
+
+
+def test_touched_file_reuses_the_cache(tmp_path, monkeypatch):
+    rows = sample_rows()
+    path = tmp_path / 'run.csv'
+    write_csv(path, rows)
+    load_columns(path)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def rebuild(*args):
+        raise AssertionError('cache rebuilt for an unchanged file')
+    monkeypatch.setattr(ingestion, 'build_cache', rebuild)
+    assert_columns_equal(load_columns(path), rows)
+    assert ingestion.cached_manifest(path)['mtime_ns'] == path.stat().st_mtime_ns
+
+
+def test_dtype_change_rebuilds_the_cache(tmp_path):
+    rows = sample_rows()
+    path = tmp_path / 'run.csv'
+    write_csv(path, rows)
+    assert load_columns(path, ['Voltage'], dtype='float32')['Voltage'].dtype == np.float32
+    voltage = load_columns(path, ['Voltage'])['Voltage']
+    assert voltage.dtype == np.float64
+    np.testing.assert_array_equal(voltage, rows[:, 1])
+
+
+def test_csv_and_workbook_load_the_same_columns(tmp_path):
+    pytest.importorskip('openpyxl')
+    rows = sample_rows()
+    rows[0, 0] = np.nan
+    rows[3, 5] = np.nan
+    write_csv(tmp_path / 'run.csv', rows)
+    sheet = pd.DataFrame(HEADER + rows.tolist())
+    sheet.to_excel(tmp_path / 'run.xlsx', header=False, index=False)
+    from_csv = load_columns(tmp_path / 'run.csv')
+    from_xlsx = load_columns(tmp_path / 'run.xlsx')
+    for name in COLUMNS:
+        np.testing.assert_array_equal(from_csv[name], from_xlsx[name])
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import instrumentation
+from rendering import PlotSpec, render_all
+
+
+@pytest.fixture
+def tracer():
+    instrumentation.enable(memory=True)
+    yield instrumentation.tracer
+    instrumentation.tracer.disable()
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_savefig_stages_of_render_workers_reach_the_trace(tracer, tmp_path, processes):
+    x = np.linspace(0.0, 1.0, 50)
+    specs = [PlotSpec(f'plot{i}.png', 'title', 'x', 'y', x, x ** i, None, None, 'blue', None) for i in range(3)]
+    render_all(specs, tmp_path, processes=processes)
+    records = tracer.trace()['stages']
+    render = next(record for record in records if record['stage'] == 'render')
+    saves = [record for record in records if record['stage'] == 'savefig']
+    assert len(saves) == len(specs)
+    for record in saves:
+        assert record['depth'] == render['depth'] + 1
+        assert record['rows'] == x.size and record['peak_bytes'] > 0
+        # Worker clocks are mapped onto the parent's: every save lies inside the render stage
+        assert render['start'] <= record['start'] <= render['start'] + render['seconds']
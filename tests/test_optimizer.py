@@ -0,0 +1,30 @@
+import numpy as np
+
+from ingestion import REPO_ROOT, load_columns
+from optimizer import FLOW, OperatingPointOptimizer, _suffix_best
+
+BOOK1 = REPO_ROOT / 'data' / 'raw' / 'Book1.xlsx'
+
+
+def test_suffix_best_matches_brute_force():
+    rng = np.random.default_rng(0)
+    flows = rng.integers(0, 20, (4, 200)).astype(float)  # Duplicated flows exercise the ties
+    scores = rng.integers(0, 10, (4, 200)).astype(float)
+    sorted_flows, best = _suffix_best(flows, scores)
+    for row in range(flows.shape[0]):
+        np.testing.assert_array_equal(sorted_flows[row], np.sort(flows[row]))
+        for target in np.unique(flows[row]):
+            position = np.searchsorted(sorted_flows[row], target, side='left')  # As query() looks it up
+            eligible = flows[row] >= target
+            assert flows[row, best[row, position]] >= target
+            assert scores[row, best[row, position]] == scores[row, eligible].max()
+
+
+def test_recommendation_stays_within_measured_values():
+    data = load_columns(BOOK1, ['Power_Level', 'Temperature', FLOW, 'Overall_Efficiency'], dropna=True)
+    optimizer = OperatingPointOptimizer(data)
+    result = optimizer.query([0.0, 0.2, 0.3])
+    assert optimizer.value.max() <= data['Overall_Efficiency'].max()
+    assert result.objective[0] == data['Overall_Efficiency'].max()
+    assert abs(result.power_level[0] - data['Power_Level'][np.argmax(data['Overall_Efficiency'])]) < 1.0
+    assert np.all(result.flow >= [0.0, 0.2, 0.3])
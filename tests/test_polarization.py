@@ -0,0 +1,58 @@
+import warnings
+
+import numpy as np
+
+from polarization import cell_voltage, fit_polarization_batch
+
+
+def noisy_curves(j_high, r_ohm, n_curves=40, points=60, seed=0):
+    rng = np.random.default_rng(seed)
+    currents = [np.sort(rng.uniform(5.0, j_high, points)) for _ in range(n_curves)]
+    voltages = [cell_voltage(j, 1.23, 2e-3, 0.035, r_ohm, 0.02, 0.25) + rng.normal(0, 0.002, points)
+                for j in currents]
+    return currents, voltages
+
+
+def test_curves_reaching_the_limiting_current_converge_and_identify_r_ohm():
+    currents, voltages = noisy_curves(237.0, 2.0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        models = fit_polarization_batch(currents, voltages)
+    assert all(m.converged for m in models)
+    assert all(m.r_ohm_identified for m in models)
+    errors = np.abs([m.r_ohm - 2.0 for m in models])
+    assert np.percentile(errors, 90) < 0.15
+
+
+def test_degenerate_concentration_term_reports_r_ohm_unidentified():
+    # Up to 0.72 j_lim the concentration term is nearly linear in j
+    currents, voltages = noisy_curves(180.0, 2.0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        models = fit_polarization_batch(currents, voltages)
+    assert np.mean([m.converged for m in models]) > 0.95
+    for m in models:
+        if m.r_ohm_identified:
+            assert abs(m.r_ohm - 2.0) < 4 * m.r_ohm_stderr
+    assert not all(m.r_ohm_identified for m in models)
+
+
+def test_curves_without_more_points_than_parameters_are_not_converged():
+    # 5 parameters with the concentration term, 3 without; a fit through n <= k points has zero residuals
+    j = np.array([10.0, 50.0, 100.0, 150.0, 200.0])
+    v = cell_voltage(j, 1.23, 2e-3, 0.035, 2.0, 0.02, 0.25)
+    for concentration, points in ((True, 5), (True, 3), (False, 3)):
+        model = fit_polarization_batch([j[:points]], [v[:points]], concentration=concentration)[0]
+        assert not model.converged
+        assert not model.r_ohm_identified
+        assert np.isnan(model.r_ohm_stderr)
+
+
+def test_curve_without_valid_points_is_not_converged():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        empty, invalid = fit_polarization_batch([[], [np.nan, -1.0]], [[], [1.5, 1.6]])
+    for model in (empty, invalid):
+        assert not model.converged
+        assert not model.r_ohm_identified
+        assert np.isnan(model.rmse) and np.isnan(model.r_ohm_stderr)
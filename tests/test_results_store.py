@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import efficiency
+import results_store
+import tafel_batch
+from ingestion import COLUMNS
+from polarization import cell_voltage
+
+LEVELS = np.arange(20.0, 101.0, 5.0)
+
+
+def write_run(path, n_cells=12, levels=LEVELS, rows_per_level=20, seed=0):
+    """A CSV log of a stack with `n_cells` cells, so Voltage_Cell != Voltage / N_CELLS unless n_cells is 10."""
+    rng = np.random.default_rng(seed)
+    power = np.repeat(levels, rows_per_level)
+    current_density = 2.3 * power + rng.normal(0, 0.5, power.size)
+    voltage_cell = cell_voltage(current_density, 1.23, 2e-3, 0.035, 2.0, 0.02, 0.25) + rng.normal(0, 1e-3, power.size)
+    current = current_density * 100.0 / 1000
+    columns = dict.fromkeys(COLUMNS, np.ones(power.size))
+    columns.update(Power_Level=power, Voltage=n_cells * voltage_cell, Current=current,
+                   Surface_Area=np.full(power.size, 100.0), Temperature=np.full(power.size, 60.0),
+                   Pressure=np.full(power.size, 1.0), Voltage_Cell=voltage_cell, Current_Density=current_density,
+                   Hydrogen_Mol_Flow=0.95 * current * 9 / (2 * efficiency.FARADAY))
+    frame = pd.DataFrame(columns)[COLUMNS]
+    frame.to_csv(path, index=False)
+    return frame
+
+
+@pytest.fixture
+def runs(tmp_path):
+    directory = tmp_path / 'runs'
+    directory.mkdir()
+    frames = {'a': write_run(directory / 'a.csv'),
+              'b': write_run(directory / 'b.csv', levels=np.array([30.0, 60.0, 90.0]), seed=1)}
+    return directory, tmp_path / 'runs.sqlite', frames
+
+
+def stored_runs(store):
+    conn = results_store.connect(store)
+    try:
+        return results_store.query_runs(conn).set_index('path')
+    finally:
+        conn.close()
+
+
+def test_ingest_uses_the_measured_cell_columns(runs):
+    directory, store, frames = runs
+    assert results_store.ingest(directory, store, processes=1) == 2
+    stored = stored_runs(store)
+    run = stored.loc[str(directory / 'a.csv')]
+    assert run['error'] is None
+    assert run['tafel_slope'] == pytest.approx(tafel_batch.analyze_run(directory / 'a.csv', 'x')['tafel_slope'])
+    assert run['ohmic_resistance'] == pytest.approx(2.0, abs=0.1)
+
+    conn = results_store.connect(store)
+    try:
+        result = results_store.query_metric(conn, 'Voltage_Cell', 80)
+    finally:
+        conn.close()
+    frame = frames['a']
+    assert result['value'].item() == pytest.approx(frame.loc[frame['Power_Level'] == 80, 'Voltage_Cell'].mean())
+
+
+def test_no_ohmic_resistance_without_more_bins_than_parameters(runs):
+    directory, store, _ = runs
+    results_store.ingest(directory, store, processes=1)
+    run = stored_runs(store).loc[str(directory / 'b.csv')]
+    assert run['error'] is None
+    assert np.isnan(run['ohmic_resistance'])
+
+
+def test_unchanged_runs_are_skipped_by_hash(runs):
+    directory, store, _ = runs
+    assert results_store.ingest(directory, store, processes=1) == 2
+    assert results_store.ingest(directory, store, processes=1) == 0
+    write_run(directory / 'b.csv', levels=np.array([30.0, 60.0, 90.0]), seed=2)
+    assert results_store.ingest(directory, store, processes=1) == 1
+    assert results_store.ingest(directory, store, processes=1, force=True) == 2
+    assert len(stored_runs(store)) == 2
+
+
+def test_query_metric_filters_runs_and_weights_bins(runs, tmp_path):
+    directory, store, frames = runs
+    manifest = tmp_path / 'manifest.csv'
+    pd.DataFrame({'path': ['runs/a.csv', 'runs/b.csv'], 'stack': ['A', 'B'],
+                  'date': ['2025-07-15', '2025-10-01']}).to_csv(manifest, index=False)
+    results_store.ingest(manifest, store, processes=1)
+
+    conn = results_store.connect(store)
+    try:
+        in_q3 = results_store.query_metric(conn, 'Cell_Efficiency', 60, start='2025-07-01', end='2025-09-30')
+        stack_b = results_store.query_metric(conn, 'Cell_Efficiency', 60, tolerance=5.0, stack='B')
+    finally:
+        conn.close()
+    assert list(in_q3['stack']) == ['A']
+    frame = frames['a']
+    expected = efficiency.compute_efficiencies(frame[frame['Power_Level'] == 60], e_rev=efficiency.E0)
+    assert in_q3['value'].item() == pytest.approx(expected['Cell_Efficiency'].mean())
+    # Bins within ±5 % of 60 combine 55, 60 and 65 for run a but only 60 for run b
+    assert list(stack_b['stack']) == ['B'] and stack_b['count'].item() == 20
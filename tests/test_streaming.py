@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+import pytest
+from scipy.stats import linregress
+
+from ingestion import REPO_ROOT
+from online import SAMPLE_COLUMNS, OnlineAnalyzer, _parse_json_sample, main
+from streaming import BinnedMeans, RegressionSums, RunningStats
+
+
+def chunks(*arrays, sizes=(1, 7, 100, 3, 889)):
+    start = 0
+    for size in sizes:
+        yield tuple(a[start:start + size] for a in arrays)
+        start += size
+
+
+def test_running_stats_merge_matches_numpy():
+    values = np.random.default_rng(0).normal(1e3, 2.0, 1_000)
+    stats = RunningStats()
+    for (chunk,) in chunks(values):
+        stats.update(chunk)
+    result = stats.as_dict()
+    assert result['count'] == values.size
+    assert result['mean'] == pytest.approx(values.mean(), rel=1e-12)
+    assert result['std'] == pytest.approx(values.std(ddof=1), rel=1e-9)
+    assert (result['min'], result['max']) == (values.min(), values.max())
+
+
+def test_running_stats_ignore_non_finite_values():
+    stats = RunningStats()
+    stats.update([np.inf])
+    stats.update([1.0, np.nan, 3.0, -np.inf])
+    assert stats.as_dict() == {'count': 2, 'mean': 2.0, 'std': pytest.approx(np.sqrt(2)), 'min': 1.0, 'max': 3.0}
+
+
+def test_regression_sums_merge_matches_linregress():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(2.0, 2.3, 1_000)
+    y = 300 + 120 * x + rng.normal(0, 1.0, x.size)
+    sums = RegressionSums()
+    for cx, cy in chunks(x, y):
+        sums.update(cx, cy)
+    result, expected = sums.result(), linregress(x, y)
+    assert result['slope'] == pytest.approx(expected.slope, rel=1e-9)
+    assert result['intercept'] == pytest.approx(expected.intercept, rel=1e-9)
+    assert result['r_value'] == pytest.approx(expected.rvalue, rel=1e-9)
+    assert result['std_err'] == pytest.approx(expected.stderr, rel=1e-9)
+
+
+def test_binned_means_merge_and_skip_non_finite_values():
+    rng = np.random.default_rng(2)
+    power = rng.integers(20, 25, 1_000).astype(float)
+    values = rng.normal(0.7, 0.01, power.size)
+    values[[5, 500]] = np.inf
+    binned = BinnedMeans(['eta'])
+    for cp, cv in chunks(power, values):
+        binned.update(cp, {'eta': cv})
+    levels, means, counts = binned.means('eta')
+    finite = np.isfinite(values)
+    for level, mean, count in zip(levels, means, counts):
+        rows = finite & (power == level)
+        assert count == rows.sum()
+        assert mean == pytest.approx(values[rows].mean(), rel=1e-12)
+
+
+def sample(current=100.0, voltage=40.0):
+    return {'Power_Level': 50.0, 'Voltage': voltage, 'Current': current, 'Surface_Area': 702.0,
+            'Hydrogen_Mol_Flow': 0.01, 'Temperature': 60.0, 'Pressure': 5.0}
+
+
+def test_online_skips_idle_samples():
+    analyzer = OnlineAnalyzer()
+    analyzer.update(sample(current=0.0))
+    analyzer.update(sample(voltage=0.0))
+    for _ in range(100):
+        analyzer.update(sample())
+    snapshot = analyzer.snapshot()
+    assert (snapshot['samples'], snapshot['skipped']) == (100, 2)
+    for stats in snapshot['stats'].values():
+        assert np.isfinite([stats['mean'], stats['max']]).all()
+
+
+def test_json_samples_missing_fields_are_rejected():
+    line = '{' + ', '.join(f'"{name}": 1' for name in SAMPLE_COLUMNS) + '}'
+    assert _parse_json_sample(line) == {name: 1.0 for name in SAMPLE_COLUMNS}
+    assert _parse_json_sample('{"Power_Level": 50}') is None
+    assert _parse_json_sample('[1, 2, 3]') is None
+    assert _parse_json_sample('{"Power_Level": null}') is None
+
+
+def test_bin_width_is_accepted_after_the_source(capsys):
+    main(['replay', str(REPO_ROOT / 'data' / 'raw' / 'Book1.xlsx'), '--bin-width', '10', '--batch-size', '100'])
+    out = capsys.readouterr().out
+    snapshot = json.loads(out[out.index('{\n'):])  # The indented final snapshot follows the per-update lines
+    assert snapshot['samples'] == 17
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from tafel_region import _window_scores, bootstrap_region, find_tafel_region, fit_window
+
+
+def tafel_curve(n, seed=0, noise=2.0):
+    """Linear Tafel region above log10 j = -1.5, bending away below it."""
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(-3.0, 0.0, n))
+    y = 300 + 120 * x - 150 * np.square(np.minimum(x + 1.5, 0.0)) + rng.normal(0, noise, n)
+    return x, y
+
+
+def brute_force_best(x, y, min_points, stability_weight):
+    best = (-np.inf, -1, -1)
+    for i in range(x.size):
+        for k in range(i + min_points, x.size + 1):
+            wx, wy = x[i:k], y[i:k]
+            dx, dy = wx - wx.mean(), wy - wy.mean()
+            cxx, cxy, cyy = dx @ dx, dx @ dy, dy @ dy
+            slope = cxy / cxx
+            if not slope > 0:
+                continue
+            r_squared = cxy * cxy / (cxx * cyy)
+            rel_stderr = np.sqrt(max(cyy - slope * cxy, 0.0) / (k - i - 2) / cxx) / slope
+            score = r_squared - stability_weight * rel_stderr
+            if score > best[0]:
+                best = (score, i, k)
+    return best
+
+
+def test_window_scores_match_brute_force():
+    x, y = tafel_curve(60, noise=5.0)
+    x, y = x - x.mean(), y - y.mean()
+    score, start, stop = _window_scores(x, y, 5, 1.0, 0.0)
+    expected = brute_force_best(x, y, 5, 1.0)
+    assert (start, stop) == expected[1:]
+    assert score == pytest.approx(expected[0], rel=1e-9)
+
+
+def test_j0_interval_matches_monte_carlo_spread():
+    # Points far from log10 j = 0 make the slope/intercept covariance dominate
+    rng = np.random.default_rng(1)
+    x = np.linspace(-2.5, -1.5, 400)
+    slope, intercept, sigma = 120.0, 300.0, 3.0
+    fit = fit_window(x, intercept + slope * x + rng.normal(0, sigma, x.size))
+    half_width = np.log10(fit.j0_ci[1] / fit.j0)
+
+    samples = intercept + slope * x + rng.normal(0, sigma, (20_000, x.size))
+    slopes, intercepts = np.polynomial.polynomial.polyfit(x, samples.T, 1)[::-1]
+    log_j0 = -intercepts / slopes
+    expected = np.subtract(*np.percentile(log_j0, [97.5, 2.5])) / 2
+    assert half_width == pytest.approx(expected, rel=0.15)
+
+
+def test_j0_interval_matches_bootstrap():
+    x, y = tafel_curve(300, seed=2)
+    fit = find_tafel_region(x, y)
+    boot = bootstrap_region(x, y, fit, n_resamples=20_000, seed=3)
+    assert np.log10(fit.j0_ci[0]) == pytest.approx(np.log10(boot.j0_ci[0]), abs=0.1 * np.log10(fit.j0_ci[1] / fit.j0_ci[0]))
+    assert np.log10(fit.j0_ci[1]) == pytest.approx(np.log10(boot.j0_ci[1]), abs=0.1 * np.log10(fit.j0_ci[1] / fit.j0_ci[0]))
+
+
+def test_grouped_search_matches_full_search():
+    x, y = tafel_curve(2_000, seed=4)
+    full = find_tafel_region(x, y, max_points=None)
+    grouped = find_tafel_region(x, y, max_points=200)
+    assert grouped.n == grouped.stop - grouped.start
+    assert grouped.log_j_range[0] == pytest.approx(full.log_j_range[0], abs=0.1)
+    assert grouped.slope == pytest.approx(full.slope, rel=0.01)
+    # The window indexes the sorted raw points, so the bootstrap refits the same rows
+    boot = bootstrap_region(x, y, grouped, n_resamples=1_000, seed=5)
+    assert boot.slope_ci[0] < grouped.slope < boot.slope_ci[1]